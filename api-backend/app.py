@@ -1,56 +1,162 @@
 # backend/app.py
 import time
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 import psycopg2
-from psycopg2 import sql
+from psycopg2 import errors
 from psycopg2.extras import RealDictCursor
-from datetime import date, datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import ValidationError
 
 import config
+from cache import ResponseCache, supported_encodings
+from db import get_db_connection, get_pool, PoolTimeout
+from metrics import REGISTRY, observe_request, stage, stats_gauges
+from models import ConferenceQuery, SearchQuery
+from queries import CATEGORY_CATALOG_QUERY, clusters_query, markers_query, page_rows, search_query, search_rows
+from responses import encode_catalog, encode_markers, iso_dates, prefers_ndjson, stream_json
+from snapshot import SnapshotStore
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["ETag", "X-Next-After-Id"])
 
+snapshots = SnapshotStore(config.DATA_VERSION_CHECK_INTERVAL)
+
+# The snapshot store already rate-limits version checks, so the cache can follow its version directly
+markers_cache = ResponseCache(config.MARKERS_CACHE_SIZE, config.MARKERS_CACHE_TTL, 0)
+categories_cache = ResponseCache(2, config.MARKERS_CACHE_TTL, 0)
+search_cache = ResponseCache(config.SEARCH_CACHE_SIZE, config.MARKERS_CACHE_TTL, 0)
+
+REGISTRY.register_collector(lambda: (
+    stats_gauges('api_db_pool', get_pool().stats(), 'Connection pool')
+    + stats_gauges('api_markers_cache', markers_cache.stats(), 'Markers response cache')
+    + stats_gauges('api_categories_cache', categories_cache.stats(), 'Categories response cache')
+    + stats_gauges('api_search_cache', search_cache.stats(), 'Search response cache')
+    + stats_gauges('api_marker_snapshot', snapshots.stats(), 'Marker snapshot')
+))
+
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    return jsonify({'error': str(e)}), 503
+
+@app.errorhandler(ValidationError)
+def handle_validation_error(e):
+    return jsonify({'error': e.errors(include_url=False, include_context=False, include_input=False)}), 400
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    # Streamed bodies are written after this hook, so their size is unknown here
+    size = None if response.is_streamed else response.calculate_content_length()
+    observe_request(endpoint, response.status_code, time.perf_counter() - g.request_start, size)
+    return response
+
+
+def fetch_category_catalog():
+    """
+    Per-category conference counts and date ranges from the database, as MarkerSnapshot.catalog.
+    Only used until the scraper has published a marker snapshot.
+    """
+    with get_db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(CATEGORY_CATALOG_QUERY)
+        return iso_dates(cur.fetchall())
 
-def get_db_connection():
-    conn = psycopg2.connect(
-        dbname=config.DB_NAME,
-        user=config.DB_USER,
-        password=config.DB_PASSWORD,
-        host=config.DB_HOST,
-        port=config.DB_PORT
-    )
-    return conn
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
     """
-    Return a list of category names.
+    Return a list of category names, limited to categories with at least one stored conference.
+    With ?detail=true, returns objects with each category's conference count and date range instead.
+
+    The catalog is built in memory alongside the marker snapshot, so it only changes when the
+    scraper publishes new data. Responses carry an ETag and a Cache-Control max-age, so clients
+    can rely on their HTTP cache.
     """
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    detail = request.args.get('detail', '').lower() in ('1', 'true', 'yes')
+    snapshot = snapshots.current()
+    categories_cache.check_version(lambda: snapshots.version)
+    entry = categories_cache.get(detail)
+    if entry is None:
+        with stage('/api/categories', 'query'):
+            catalog = snapshot.catalog if snapshot else fetch_category_catalog()
+        with stage('/api/categories', 'serialize'):
+            body = app.json.dumps(encode_catalog(catalog, detail)).encode()
+        entry = categories_cache.put(detail, body)
+
+    response = cached_response(categories_cache, entry, '/api/categories')
+    response.cache_control.public = True
+    response.cache_control.max_age = config.CATEGORIES_MAX_AGE
+    return response
+
+
+def fetch_markers(query):
+    """
+    Run the marker query for a validated ConferenceQuery against the database, returning the
+    page of records and the id to resume after, as MarkerSnapshot.markers does.
+    Only used until the scraper has published a marker snapshot.
+    """
+    sql_query, params = markers_query(query)
+    with get_db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql_query, params)
+        rows = cur.fetchall()
+    return page_rows(rows, query)
+
+
+def stream_markers_from_db(query):
+    """
+    Lazily yield the marker records for a validated ConferenceQuery from a server-side cursor,
+    holding a pooled connection until the generator is exhausted or closed.
+    Only used until the scraper has published a marker snapshot.
+    """
+    sql_query, params = markers_query(query)
+    fields = query.marker_fields()
+    with get_db_connection() as conn, conn.cursor(name="markers_stream", cursor_factory=RealDictCursor) as cur:
+        cur.itersize = config.MARKERS_STREAM_CHUNK_SIZE
+        cur.execute(sql_query, params)
+        for row in cur:
+            yield {f: row[f] for f in fields}
+
+
+def fetch_clusters(query):
+    """
+    Grid clusters for a validated ConferenceQuery, from the database.
+    Only used until the scraper has published a marker snapshot.
+    """
+    sql_query, params = clusters_query(query)
+    with get_db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql_query, params)
+        return cur.fetchall()
+
+
+def cached_response(cache, entry, endpoint):
+    """
+    Build the response for a cache entry, answering 304 if the client's copy is current and
+    compressing the body if the client accepts one of our content codings.
+    """
+    body, etag = entry.body, entry.etag
+    encoding = None
+    if len(body) >= config.COMPRESSION_MIN_SIZE:
+        encoding = request.accept_encodings.best_match(supported_encodings())
+        if encoding:
+            with stage(endpoint, 'compress'):
+                body, etag = cache.compressed(entry, encoding)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json', headers=entry.headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
 
-    cur.execute("""SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'""")
-    try:
-        tables = [
-            x["table_name"].split("cleaned_")[1].replace("_", " ").title()
-                  for x in cur.fetchall() if "cleaned" in x["table_name"]
-        ]
-        tables.sort()
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    return jsonify(tables)
-
-
-class ConferenceQuery(BaseModel):
-    categories: Optional[list] = None
-    start_date: Optional[date] = None
-    end_date: Optional[date] = None
-    open_cfp: Optional[bool] = None
 
 @app.route('/api/markers', methods=['POST'])
 def get_markers():
@@ -60,64 +166,132 @@ def get_markers():
     - Selected categories
     - Date range
     - CFP status (open/closed based on current date)
+    - Viewport bounding box
+
+    When a zoom level below CLUSTER_MAX_ZOOM is given, returns {"zoom": ..., "clusters": [...]}
+    with server-side grid clusters instead of a list of markers.
+
+    Markers are returned in id order, and may be:
+    - Projected onto a subset of fields
+    - Paginated with limit and after_id; the id to resume after is sent in the X-Next-After-Id header
+    - Laid out as columns, i.e. {"field": [values...]}, instead of a list of objects
+
+    Queries are answered from the in-memory marker snapshot published at the end of each scraper run.
+    Encoded responses are cached per normalized filter set until the scraper publishes new data.
+    Clients may send the returned ETag back as If-None-Match to receive a 304 instead of the body.
+    Bodies are compressed with gzip or brotli, as negotiated by Accept-Encoding.
+
+    With stream set, markers are instead written out incrementally (uncached and uncompressed), as
+    a JSON array or, if the client accepts application/x-ndjson, as newline-delimited JSON.
     """
-    data = request.get_json()
-    categories = data.get('categories') or None
-    start_date = data.get('start_date') or None
-    end_date = data.get('end_date') or None
-    open_cfp = data.get('open_cfp') or None
-    current_date = datetime.now()
-
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    # Build query based on input parameters
-    queries = []
-    if categories:
-        for category in categories:
-            table = f"{config.CLEANED_OUTPUT_TABLE}_{category['value'].lower().replace(' ', '_')}"
-            # Extract the first date from CFP string (before any parentheses)
-            query = f"""
-                SELECT *,
-                CASE 
-                    WHEN cfp IS NULL OR cfp = '' THEN true
-                    WHEN TO_TIMESTAMP(SPLIT_PART(cfp, ' (', 1), 'Mon DD, YYYY') > NOW() THEN false
-                    ELSE true
-                END as past_submission_date
-                FROM {table}
-                WHERE 1=1
-            """
-            
-            if start_date:
-                start_date_obj = datetime.strptime(start_date.rstrip("Z"), '%Y-%m-%dT%H:%M:%S.%f')
-                query += f" AND start_date >= '{start_date_obj}'"
-            if end_date:
-                end_date_obj = datetime.strptime(end_date.rstrip("Z"), '%Y-%m-%dT%H:%M:%S.%f')
-                query += f" AND end_date <= '{end_date_obj}'"
-            if open_cfp:
-                query += f" AND (cfp IS NOT NULL AND cfp != '' AND TO_TIMESTAMP(SPLIT_PART(cfp, ' (', 1), 'Mon DD, YYYY') > NOW())"
-
-            queries.append(query)
-    else:
+    query = ConferenceQuery.model_validate(request.get_json() or {})
+    if not query.categories:
         return jsonify([])
 
-    # Retrieve the data
-    full_query = " UNION ALL ".join(queries)
-    cur.execute(full_query)
-    markers = cur.fetchall()
+    snapshot = snapshots.current()
+    if query.stream and not query.clustered():
+        if snapshot:
+            indices, _ = snapshot.page(query)
+            records = snapshot.iter_markers(indices, query.marker_fields())
+        else:
+            records = stream_markers_from_db(query)
+        ndjson = prefers_ndjson(request.headers.get('Accept'))
+        return Response(
+            stream_with_context(stream_json(records, app.json.dumps, ndjson)),
+            mimetype='application/x-ndjson' if ndjson else 'application/json'
+        )
+
+    markers_cache.check_version(lambda: snapshots.version)
+    key = query.cache_key()
+    entry = markers_cache.get(key)
+    if entry is None:
+        headers = None
+        with stage('/api/markers', 'query'):
+            if query.clustered():
+                clusters = snapshot.clusters(query) if snapshot else fetch_clusters(query)
+            else:
+                records, next_after_id = snapshot.markers(query) if snapshot else fetch_markers(query)
+        with stage('/api/markers', 'serialize'):
+            if query.clustered():
+                body = {'zoom': query.zoom, 'clusters': clusters}
+            else:
+                body = encode_markers(records, query)
+                if next_after_id is not None:
+                    headers = {'X-Next-After-Id': str(next_after_id)}
+            body = app.json.dumps(body).encode()
+        entry = markers_cache.put(key, body, headers)
+
+    return cached_response(markers_cache, entry, '/api/markers')
+
+
+def fetch_search_results(query):
+    """
+    Ranked search results for a validated SearchQuery, from the published snapshot's trigram
+    indexes. Empty until the scraper has published a snapshot.
+    """
+    sql_query, params = search_query(query)
+    with get_db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        try:
+            cur.execute(sql_query, params)
+        except errors.UndefinedTable:
+            return []
+        return search_rows(cur.fetchall(), query)
+
+
+@app.route('/api/search', methods=['GET'])
+def search_conferences():
+    """
+    Typeahead search over conference names and abbreviations, e.g. /api/search?q=neurips&limit=5.
+    Matches abbreviation prefixes and fuzzy (trigram) matches within names and abbreviations,
+    best first, each with its match score. Accepts the same categories, start_date, end_date and
+    open_cfp filters as /api/markers, with categories and fields repeated as needed, and a limit.
+
+    Only the matching conferences are returned, so the client never needs the full marker set.
+    Responses are cached per normalized query until the scraper publishes new data.
+    """
+    query = SearchQuery.from_params(request.args)
+    # Results are read from the database, but the snapshot store tracks the data version they belong to
+    snapshots.current()
+    search_cache.check_version(lambda: snapshots.version)
+    key = query.cache_key()
+    entry = search_cache.get(key)
+    if entry is None:
+        with stage('/api/search', 'query'):
+            results = fetch_search_results(query)
+        with stage('/api/search', 'serialize'):
+            body = app.json.dumps(results).encode()
+        entry = search_cache.put(key, body)
+
+    return cached_response(search_cache, entry, '/api/search')
 
-    # Remove duplicates, i.e. conferences listed in multiple tables
-    seen = set()
-    unique = []
-    for marker in markers:
-        if marker['name'] not in seen:
-            seen.add(marker['name'])
-            unique.append(marker)
 
-    cur.close()
-    conn.close()
-    return jsonify(unique)
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Return internal service metrics, e.g. connection pool wait times and response cache hit rates.
+    """
+    return jsonify({
+        'db_pool': get_pool().stats(),
+        'markers_cache': markers_cache.stats(),
+        'categories_cache': categories_cache.stats(),
+        'search_cache': search_cache.stats(),
+        'marker_snapshot': snapshots.stats(),
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def get_prometheus_metrics():
+    """
+    Return request counts, latency, per-stage timings and response sizes, along with the
+    figures from /api/metrics, in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
+    # Load the snapshot (and category catalog) up front, rather than on the first request
+    try:
+        snapshots.current()
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Marker snapshot not loaded at startup: {e}")
     app.run(host=config.HOST, port=config.PORT, debug=True, )
@@ -0,0 +1,421 @@
+# backend/asgi_app.py
+"""
+Production serving mode: the same /api/categories, /api/markers, /api/search, /api/metrics and /metrics
+contract as app.py, on an ASGI stack (Starlette under uvicorn) with asyncpg, so in-flight database
+queries don't each tie up a worker thread. Run with e.g.:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time as dt_time, timezone
+from email.utils import format_datetime
+
+import asyncpg
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import config
+from cache import ResponseCache, negotiate_encoding
+from metrics import REGISTRY, observe_request, stage, stats_gauges
+from models import ConferenceQuery, SearchQuery
+from queries import (
+    CATEGORY_CATALOG_QUERY, clusters_query, markers_query, page_rows, search_query, search_rows, to_asyncpg
+)
+from db import PoolTimeout
+from responses import encode_catalog, encode_chunk, encode_markers, iso_dates, prefers_ndjson, stream_json
+from snapshot import MarkerSnapshot, SnapshotStore
+
+pool = None
+snapshots = SnapshotStore(config.DATA_VERSION_CHECK_INTERVAL)
+snapshot_lock = asyncio.Lock()
+
+# The snapshot store already rate-limits version checks, so the caches can follow its version directly
+markers_cache = ResponseCache(config.MARKERS_CACHE_SIZE, config.MARKERS_CACHE_TTL, 0)
+categories_cache = ResponseCache(2, config.MARKERS_CACHE_TTL, 0)
+search_cache = ResponseCache(config.SEARCH_CACHE_SIZE, config.MARKERS_CACHE_TTL, 0)
+
+ENDPOINTS = ("/api/categories", "/api/markers", "/api/search", "/api/metrics", "/metrics")
+
+
+def json_default(o):
+    """
+    Render dates as HTTP dates, as Flask's JSON provider does, so both servers return identical bodies.
+    """
+    if isinstance(o, date):
+        if not isinstance(o, datetime):
+            o = datetime.combine(o, dt_time())
+        o = o.replace(tzinfo=timezone.utc) if o.tzinfo is None else o.astimezone(timezone.utc)
+        return format_datetime(o, usegmt=True)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    return json.dumps(obj, default=json_default, sort_keys=True)
+
+
+@asynccontextmanager
+async def acquire():
+    """
+    A pooled connection, raising PoolTimeout if none frees up within DB_POOL_TIMEOUT seconds.
+    Timeouts of the queries run on it are left to propagate as they are.
+    """
+    try:
+        conn = await pool.acquire(timeout=config.DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"No database connection available after {config.DB_POOL_TIMEOUT} seconds") from None
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+async def fetch_data_version():
+    """
+    Return the data version stamp bumped by the scraper, or 0 if the scraper hasn't created it yet.
+    """
+    async with acquire() as conn:
+        try:
+            version = await conn.fetchval(f"SELECT version FROM {config.DATA_VERSION_TABLE};")
+        except asyncpg.UndefinedTableError:
+            return 0
+    return version or 0
+
+
+async def load_snapshot():
+    """
+    Read the published snapshot and its data version in one repeatable-read transaction, as
+    snapshot.load_snapshot does, then build the in-memory arrays off the event loop.
+    """
+    async with acquire() as conn, conn.transaction(isolation="repeatable_read", readonly=True):
+        try:
+            version = await conn.fetchval(f"SELECT version FROM {config.DATA_VERSION_TABLE};") or 0
+            rows = await conn.fetch(f"SELECT * FROM {config.MARKER_SNAPSHOT_TABLE} ORDER BY id;")
+            categories = await conn.fetch(f"SELECT id, category FROM {config.CATEGORIES_TABLE} ORDER BY id;")
+        except asyncpg.UndefinedTableError:
+            return None
+    return await run_in_threadpool(MarkerSnapshot, version, rows, [tuple(c) for c in categories])
+
+
+async def current_snapshot():
+    """
+    Async counterpart of SnapshotStore.current: one request loads a new snapshot while the
+    others keep answering from the previous one.
+    """
+    if not snapshots.check_due():
+        return snapshots.snapshot
+    version = await fetch_data_version()
+    if version == snapshots.version:
+        return snapshots.snapshot
+    if snapshot_lock.locked() and snapshots.snapshot is not None:
+        return snapshots.snapshot
+    async with snapshot_lock:
+        if version != snapshots.version:
+            start = time.monotonic()
+            snapshots.publish(await load_snapshot(), version, time.monotonic() - start)
+    return snapshots.snapshot
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def cached_response(request, cache, entry, headers=None):
+    """
+    Build the response for a cache entry, answering 304 if the client's copy is current and
+    compressing the body if the client accepts one of our content codings. A variant not yet
+    compressed is compressed in the thread pool, off the event loop.
+    """
+    body, etag = entry.body, entry.etag
+    headers = dict(entry.headers, **(headers or {}))
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= config.COMPRESSION_MIN_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            with stage(request.url.path, "compress"):
+                if encoding in entry.encoded:
+                    body, etag = cache.compressed(entry, encoding)
+                else:
+                    body, etag = await run_in_threadpool(cache.compressed, entry, encoding)
+            headers["Content-Encoding"] = encoding
+    headers["ETag"] = f'"{etag}"'
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def fetch_category_catalog():
+    async with acquire() as conn:
+        return iso_dates(await conn.fetch(CATEGORY_CATALOG_QUERY))
+
+
+async def get_categories(request):
+    """
+    Category names, or with ?detail=true, per-category counts and date ranges. See app.get_categories.
+    """
+    detail = request.query_params.get("detail", "").lower() in ("1", "true", "yes")
+    snapshot = await current_snapshot()
+    categories_cache.check_version(lambda: snapshots.version)
+    entry = categories_cache.get(detail)
+    if entry is None:
+        with stage("/api/categories", "query"):
+            catalog = snapshot.catalog if snapshot else await fetch_category_catalog()
+        with stage("/api/categories", "serialize"):
+            body = await run_in_threadpool(serialize, encode_catalog(catalog, detail))
+        entry = categories_cache.put(detail, body)
+    return await cached_response(
+        request, categories_cache, entry, {"Cache-Control": f"public, max-age={config.CATEGORIES_MAX_AGE}"}
+    )
+
+
+async def fetch_markers(query):
+    sql_query, params = markers_query(query)
+    async with acquire() as conn:
+        rows = await conn.fetch(to_asyncpg(sql_query), *params)
+    return page_rows(rows, query)
+
+
+async def fetch_clusters(query):
+    sql_query, params = clusters_query(query)
+    async with acquire() as conn:
+        return [dict(row) for row in await conn.fetch(to_asyncpg(sql_query), *params)]
+
+
+async def stream_markers_from_db(query, ndjson):
+    """
+    Stream encoded marker chunks from a server-side cursor, holding a pooled connection until done.
+    """
+    sql_query, params = markers_query(query)
+    fields = query.marker_fields()
+    async with acquire() as conn, conn.transaction():
+        if not ndjson:
+            yield "["
+        cursor = await conn.cursor(to_asyncpg(sql_query), *params)
+        first = True
+        while rows := await cursor.fetch(config.MARKERS_STREAM_CHUNK_SIZE):
+            yield encode_chunk([{f: row[f] for f in fields} for row in rows], dumps, ndjson, first)
+            first = False
+        if not ndjson:
+            yield "]"
+
+
+def serialize(obj):
+    return dumps(obj).encode()
+
+
+def query_snapshot(snapshot, query):
+    """
+    Clusters, or a page of markers and the next page's cursor, for a query answered from the snapshot.
+    """
+    return snapshot.clusters(query) if query.clustered() else snapshot.markers(query)
+
+
+def render_markers(query, result):
+    """
+    The serialized body and extra headers of a markers response, from query_snapshot's (or the
+    database fallback's) result.
+    """
+    if query.clustered():
+        return serialize({"zoom": query.zoom, "clusters": result}), None
+    records, next_after_id = result
+    headers = {"X-Next-After-Id": str(next_after_id)} if next_after_id is not None else None
+    return serialize(encode_markers(records, query)), headers
+
+
+async def get_markers(request):
+    """
+    Markers or grid clusters for a ConferenceQuery. See app.get_markers.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    query = ConferenceQuery.model_validate(body or {})
+    if not query.categories:
+        return JSONResponse([])
+
+    snapshot = await current_snapshot()
+    if query.stream and not query.clustered():
+        ndjson = prefers_ndjson(request.headers.get("accept"))
+        if snapshot:
+            indices, _ = await run_in_threadpool(snapshot.page, query)
+            chunks = stream_json(snapshot.iter_markers(indices, query.marker_fields()), dumps, ndjson)
+        else:
+            chunks = stream_markers_from_db(query, ndjson)
+        return StreamingResponse(chunks, media_type="application/x-ndjson" if ndjson else "application/json")
+
+    markers_cache.check_version(lambda: snapshots.version)
+    key = query.cache_key()
+    entry = markers_cache.get(key)
+    if entry is None:
+        # Filtering, serializing and compressing run in the thread pool, so a large response doesn't
+        # hold up the event loop
+        with stage("/api/markers", "query"):
+            if snapshot:
+                result = await run_in_threadpool(query_snapshot, snapshot, query)
+            else:
+                result = await (fetch_clusters(query) if query.clustered() else fetch_markers(query))
+        with stage("/api/markers", "serialize"):
+            body, headers = await run_in_threadpool(render_markers, query, result)
+        entry = markers_cache.put(key, body, headers)
+
+    return await cached_response(request, markers_cache, entry)
+
+
+async def fetch_search_results(query):
+    sql_query, params = search_query(query)
+    async with acquire() as conn:
+        try:
+            rows = await conn.fetch(to_asyncpg(sql_query), *params)
+        except asyncpg.UndefinedTableError:
+            return []
+    return search_rows(rows, query)
+
+
+async def search_conferences(request):
+    """
+    Typeahead search over conference names and abbreviations. See app.search_conferences.
+    """
+    query = SearchQuery.from_params(request.query_params)
+    await current_snapshot()
+    search_cache.check_version(lambda: snapshots.version)
+    key = query.cache_key()
+    entry = search_cache.get(key)
+    if entry is None:
+        with stage("/api/search", "query"):
+            results = await fetch_search_results(query)
+        with stage("/api/search", "serialize"):
+            body = await run_in_threadpool(serialize, results)
+        entry = search_cache.put(key, body)
+    return await cached_response(request, search_cache, entry)
+
+
+def pool_stats():
+    return {
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "size": pool.get_size(),
+        "idle": pool.get_idle_size(),
+    }
+
+
+REGISTRY.register_collector(lambda: (
+    stats_gauges("api_db_pool", pool_stats(), "Connection pool")
+    + stats_gauges("api_markers_cache", markers_cache.stats(), "Markers response cache")
+    + stats_gauges("api_categories_cache", categories_cache.stats(), "Categories response cache")
+    + stats_gauges("api_search_cache", search_cache.stats(), "Search response cache")
+    + stats_gauges("api_marker_snapshot", snapshots.stats(), "Marker snapshot")
+))
+
+
+async def get_metrics(request):
+    """
+    Internal service metrics, as app.get_metrics, with asyncpg's pool sizes.
+    """
+    return JSONResponse({
+        "db_pool": pool_stats(),
+        "markers_cache": markers_cache.stats(),
+        "categories_cache": categories_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "marker_snapshot": snapshots.stats(),
+    })
+
+
+async def get_prometheus_metrics(request):
+    """
+    Request and stage metrics in the Prometheus text format. See app.get_prometheus_metrics.
+    """
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+class RequestMetricsMiddleware:
+    """
+    Record each HTTP request's status, duration and body size, as app.py's request hooks do.
+    Streamed responses are recorded once their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        endpoint = scope["path"] if scope["path"] in ENDPOINTS else "unmatched"
+        start = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    observe_request(endpoint, status, time.perf_counter() - start, size)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def handle_validation_error(request, e):
+    return JSONResponse({"error": e.errors(include_url=False, include_context=False, include_input=False)}, 400)
+
+
+async def handle_pool_timeout(request, e):
+    return JSONResponse({"error": str(e)}, 503)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global pool
+    pool = await asyncpg.create_pool(
+        min_size=config.DB_POOL_MIN_SIZE,
+        max_size=config.DB_POOL_MAX_SIZE,
+        database=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        host=config.DB_HOST,
+        port=int(config.DB_PORT)
+    )
+    # Load the snapshot (and category catalog) up front, rather than on the first request
+    try:
+        await current_snapshot()
+    except (asyncpg.PostgresError, PoolTimeout, asyncio.TimeoutError) as e:
+        print(f"Marker snapshot not loaded at startup: {e}")
+    yield
+    await pool.close()
+
+
+app = Starlette(
+    routes=[
+        Route("/api/categories", get_categories, methods=["GET"]),
+        Route("/api/markers", get_markers, methods=["POST"]),
+        Route("/api/search", search_conferences, methods=["GET"]),
+        Route("/api/metrics", get_metrics, methods=["GET"]),
+        Route("/metrics", get_prometheus_metrics, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(
+            CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+            expose_headers=["ETag", "X-Next-After-Id"]
+        ),
+    ],
+    exception_handlers={
+        ValidationError: handle_validation_error,
+        PoolTimeout: handle_pool_timeout,
+    },
+    lifespan=lifespan,
+)
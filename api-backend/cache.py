@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import config
+
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag", "version", "expires", "headers", "encoded"])
+
+
+def supported_encodings():
+    """
+    Content codings we can produce, in order of preference.
+    """
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the content coding to use for an Accept-Encoding header value, or None for identity.
+    Codings are ranked by the client's q-values, ties going to our order of preference.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+    candidates = [
+        (accepted.get(coding, accepted.get("*", 0.0)), -rank, coding)
+        for rank, coding in enumerate(supported_encodings())
+    ]
+    quality, _, coding = max(candidates)
+    return coding if quality > 0 else None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=config.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=config.GZIP_LEVEL, mtime=0)
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of encoded response bodies with a time-to-live.
+
+    Entries are tagged with the data version they were built from. The version is polled from the
+    database at most once per check interval; when the scraper publishes new data the whole cache
+    is dropped, so responses are never served from a previous refresh.
+    """
+
+    def __init__(self, max_entries, ttl, version_check_interval):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.version = None
+        self._version_checked = 0.0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.compressions = 0
+
+    def check_version(self, fetch_version):
+        """
+        Poll the current data version (via fetch_version) if the last check is older than the check
+        interval, clearing the cache if it changed.
+        """
+        now = time.monotonic()
+        if now - self._version_checked < self.version_check_interval:
+            return self.version
+        version = fetch_version()
+        with self._lock:
+            self._version_checked = now
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+        return version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires <= time.monotonic() or entry.version != self.version:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, headers=None):
+        """
+        Store an encoded body (and any headers that go with it) under key, returning the cache entry
+        with its ETag.
+        """
+        version = self.version
+        etag = f"{version}-{hashlib.sha1(body).hexdigest()[:20]}"
+        entry = CachedResponse(body, etag, version, time.monotonic() + self.ttl, headers or {}, {})
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def compressed(self, entry, encoding):
+        """
+        Return the entry's body compressed with the given content coding, compressing it only on
+        first use. Each variant gets its own ETag, derived from the entry's.
+        """
+        variant = entry.encoded.get(encoding)
+        if variant is None:
+            variant = (compress(entry.body, encoding), f"{entry.etag}-{encoding}")
+            with self._lock:
+                entry.encoded[encoding] = variant
+                self.compressions += 1
+        return variant
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "data_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "compressions": self.compressions,
+            }
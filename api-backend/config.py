@@ -5,7 +5,7 @@ HOST = '0.0.0.0'
 PORT = 5000
 
 # Database parameters
-DB_NAME = "conference_mapper"
+DB_NAME = os.getenv("DB_NAME", "conference_mapper")
 DB_USER = "REDACTED"
 DB_PASSWORD = "REDACTED"
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -14,4 +14,37 @@ DB_PORT = "5432"
 CATEGORIES_TABLE = "conference_categories"
 GEOLOCATION_TABLE = "geolocation_mapping"
 RAW_OUTPUT_TABLE = "scraped_conferences"
-CLEANED_OUTPUT_TABLE = "scraped_conferences_cleaned"
+CLEANED_OUTPUT_TABLE = "scraped_conferences_cleaned"  # Legacy per-category tables, migrated into CONFERENCES_TABLE
+CONFERENCES_TABLE = "conferences"
+CONFERENCE_LINKS_TABLE = "conference_category_links"
+DATA_VERSION_TABLE = "data_version"
+MARKER_SNAPSHOT_TABLE = "marker_snapshot"
+
+# Connection pool parameters
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))  # seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30))  # ping connections idle longer than this
+
+# Response cache parameters
+MARKERS_CACHE_SIZE = int(os.getenv("MARKERS_CACHE_SIZE", 256))  # number of distinct filter sets kept
+MARKERS_CACHE_TTL = float(os.getenv("MARKERS_CACHE_TTL", 300))  # seconds; bounds staleness of CFP open/closed flags
+CATEGORIES_MAX_AGE = int(os.getenv("CATEGORIES_MAX_AGE", 300))  # seconds clients may reuse /api/categories without revalidating
+DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", 10))  # seconds between data version polls
+
+# Marker clustering parameters
+CLUSTER_MAX_ZOOM = 6  # requests at lower zoom levels get grid clusters instead of markers
+CLUSTER_CELL_DEGREES = 90.0  # grid cell size at zoom 0, halved with every zoom level
+
+# Marker response parameters
+MARKERS_MAX_PAGE_SIZE = int(os.getenv("MARKERS_MAX_PAGE_SIZE", 5000))  # largest accepted page limit
+MARKERS_STREAM_CHUNK_SIZE = 500  # records encoded (and fetched from the database) per streamed chunk
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller responses are sent uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Search parameters
+SEARCH_DEFAULT_LIMIT = 10  # results returned when the request doesn't set a limit
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 50))  # largest accepted limit
+SEARCH_MAX_QUERY_LENGTH = 100  # characters
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1024))  # number of distinct searches kept
@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import errors, pool
+
+import config
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    Wraps psycopg2's ThreadedConnectionPool with a semaphore, so that callers wait (up to a timeout)
+    for a free connection instead of failing as soon as the pool is exhausted. Connections are
+    health-checked on checkout and always handed back on exit of the connection() context.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, health_check_interval, **connect_kwargs):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        # Metrics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _healthy(self, conn):
+        """
+        Cheap liveness check. Connections idle for longer than the health check interval
+        are pinged with a trivial query before being handed out.
+        """
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout} seconds")
+        try:
+            conn = self._pool.getconn()
+            while not self._healthy(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            if conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+        with self._lock:
+            self.discarded += 1
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of the block. Any open transaction is
+        rolled back by the underlying pool when the connection is returned.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use so that importing
+    the app doesn't require the database to be up yet.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    config.DB_POOL_MIN_SIZE,
+                    config.DB_POOL_MAX_SIZE,
+                    config.DB_POOL_TIMEOUT,
+                    config.DB_POOL_HEALTH_CHECK_INTERVAL,
+                    dbname=config.DB_NAME,
+                    user=config.DB_USER,
+                    password=config.DB_PASSWORD,
+                    host=config.DB_HOST,
+                    port=config.DB_PORT
+                )
+    return _pool
+
+
+def get_db_connection():
+    """
+    Context manager yielding a pooled connection.
+    """
+    return get_pool().connection()
+
+
+def fetch_data_version():
+    """
+    Return the data version stamp bumped by the scraper at the end of each update,
+    or 0 if the scraper hasn't created it yet.
+    """
+    with get_db_connection() as conn, conn.cursor() as cur:
+        try:
+            cur.execute(f"SELECT version FROM {config.DATA_VERSION_TABLE};")
+        except errors.UndefinedTable:
+            return 0
+        row = cur.fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Histogram buckets, in seconds and bytes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.type = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.type = "histogram"
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # Cumulative bucket counts, then the sum and count of observations
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self._lock:
+            samples = []
+            for key, (counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", key + (("le", bound),), bucket_count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, count))
+            return samples
+
+
+class Registry:
+    """
+    Minimal Prometheus-style metrics registry, rendered in the text exposition format.
+
+    Counters and histograms are updated as requests are served. Collectors are callables run at
+    scrape time, returning (name, help, value) gauges, e.g. read from the pool's and caches' stats().
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help):
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        for collector in self._collectors:
+            for name, help, value in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def stats_gauges(prefix, stats, help):
+    """
+    Gauges for the numeric entries of a stats() dict, named <prefix>_<key>.
+    """
+    return [
+        (f"{prefix}_{key}", f"{help}: {key.replace('_', ' ')}", float(value))
+        for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("api_requests_total", "Requests served, by endpoint and status")
+REQUEST_SECONDS = REGISTRY.histogram("api_request_duration_seconds", "Request duration, by endpoint")
+STAGE_SECONDS = REGISTRY.histogram(
+    "api_stage_duration_seconds", "Time spent in each stage of a request (query, serialize, compress), by endpoint"
+)
+RESPONSE_BYTES = REGISTRY.histogram("api_response_size_bytes", "Response body size, by endpoint", SIZE_BUCKETS)
+
+
+@contextmanager
+def stage(endpoint, name):
+    """
+    Time a stage of handling a request to endpoint.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, stage=name)
+
+
+def observe_request(endpoint, status, seconds, size):
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    if size is not None:
+        RESPONSE_BYTES.observe(size, endpoint=endpoint)
@@ -0,0 +1,158 @@
+from datetime import date
+from typing import Literal, Optional
+import math
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+import config
+from snapshot import MARKER_FIELDS
+
+
+class ConferenceFilters(BaseModel):
+    """
+    Filters and field selection shared by marker and search queries.
+    """
+    categories: Optional[list] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    open_cfp: Optional[bool] = None
+    fields: Optional[list[str]] = None
+
+    @field_validator('categories', mode='before')
+    @classmethod
+    def normalize_categories(cls, value):
+        """
+        Accept category objects as sent by the frontend ({"value": "Machine Learning", ...}) or
+        plain names. Names are lowercased, deduplicated and sorted so equivalent selections compare equal.
+        """
+        if not value:
+            return None
+        if not isinstance(value, list):
+            raise ValueError("categories must be a list")
+        names = set()
+        for c in value:
+            name = c.get('value') if isinstance(c, dict) else c
+            if not isinstance(name, str):
+                raise ValueError("each category must be a name or an object with a string 'value'")
+            names.add(name.strip().lower())
+        return sorted(names)
+
+    @field_validator('start_date', 'end_date', mode='before')
+    @classmethod
+    def round_to_date(cls, value):
+        """
+        Round ISO timestamps (e.g. "2025-03-01T17:12:45.123Z") down to their date.
+        """
+        if isinstance(value, str) and 'T' in value:
+            return value.split('T')[0]
+        return value or None
+
+    @field_validator('fields')
+    @classmethod
+    def normalize_fields(cls, value):
+        """
+        Deduplicate selected fields and put them in canonical order, so equivalent projections compare equal.
+        """
+        if not value:
+            return None
+        unknown = set(value) - set(MARKER_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+        return [f for f in MARKER_FIELDS if f in value]
+
+    def marker_fields(self):
+        return self.fields or MARKER_FIELDS
+
+
+class ConferenceQuery(ConferenceFilters):
+    bbox: Optional[list[float]] = None
+    zoom: Optional[int] = Field(default=None, ge=0, le=22)
+    after_id: Optional[int] = None
+    limit: Optional[int] = Field(default=None, ge=1, le=config.MARKERS_MAX_PAGE_SIZE)
+    layout: Literal['records', 'columns'] = 'records'
+    stream: bool = False
+
+    @field_validator('bbox')
+    @classmethod
+    def normalize_bbox(cls, value):
+        """
+        Viewport as [west, south, east, north] degrees, e.g. from Leaflet's map.getBounds().
+        Longitudes are wrapped into [-180, 180), and the box is widened to two decimal places
+        so that nearby viewports share cache entries.
+        """
+        if value is None:
+            return None
+        if len(value) != 4:
+            raise ValueError("bbox must be [west, south, east, north]")
+        west, south, east, north = value
+        if south > north:
+            raise ValueError("bbox south must not exceed north")
+        if east - west >= 360:
+            west, east = -180.0, 180.0
+        else:
+            west, east = ((west + 180) % 360) - 180, ((east + 180) % 360) - 180
+        return [
+            math.floor(west * 100) / 100, max(-90.0, math.floor(south * 100) / 100),
+            math.ceil(east * 100) / 100, min(90.0, math.ceil(north * 100) / 100),
+        ]
+
+    @model_validator(mode='after')
+    def check_stream(self):
+        """
+        Streamed responses are written record by record, so they can't be paginated or laid out as columns.
+        """
+        if self.stream and (self.limit or self.after_id is not None or self.layout != 'records'):
+            raise ValueError("stream can't be combined with limit, after_id or the columns layout")
+        return self
+
+    def bbox_boxes(self):
+        """
+        The viewport as one (west, south, east, north) box, or two if it crosses the antimeridian.
+        """
+        west, south, east, north = self.bbox
+        if west <= east:
+            return [(west, south, east, north)]
+        return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+    def clustered(self):
+        """
+        Whether the viewport is zoomed out far enough to be served clusters rather than markers.
+        """
+        return self.zoom is not None and self.zoom < config.CLUSTER_MAX_ZOOM
+
+    def cache_key(self):
+        filters = (tuple(self.categories or ()), self.start_date, self.end_date, bool(self.open_cfp), tuple(self.bbox or ()))
+        if self.clustered():
+            return filters + ('clusters', self.zoom)
+        return filters + ('markers', tuple(self.marker_fields()), self.after_id, self.limit, self.layout)
+
+
+class SearchQuery(ConferenceFilters):
+    q: str = Field(min_length=1, max_length=config.SEARCH_MAX_QUERY_LENGTH)
+    limit: int = Field(default=config.SEARCH_DEFAULT_LIMIT, ge=1, le=config.SEARCH_MAX_LIMIT)
+
+    @field_validator('q')
+    @classmethod
+    def normalize_q(cls, value):
+        """
+        Lowercase the search text and collapse runs of whitespace, so equivalent queries compare equal.
+        """
+        value = ' '.join(value.lower().split())
+        if not value:
+            raise ValueError('q must not be blank')
+        return value
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Validate a query string (Flask's request.args or Starlette's query_params), in which
+        categories and fields may be repeated, e.g. ?q=neur&categories=machine+learning&categories=robotics.
+        """
+        values = {key: params.get(key) for key in ('q', 'start_date', 'end_date', 'open_cfp', 'limit') if params.get(key)}
+        return cls.model_validate(dict(values, categories=params.getlist('categories'), fields=params.getlist('fields')))
+
+    def cache_key(self):
+        return (
+            self.q, tuple(self.categories or ()), self.start_date, self.end_date, bool(self.open_cfp),
+            tuple(self.marker_fields()), self.limit
+        )
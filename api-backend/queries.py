@@ -0,0 +1,167 @@
+import re
+
+import config
+
+
+# Marker rows, with whether each conference's submission deadline has passed
+MARKERS_SELECT = f"""
+    SELECT c.*,
+    (c.cfp_deadline IS NULL OR c.cfp_deadline <= NOW()) as past_submission_date
+    FROM {config.CONFERENCES_TABLE} c
+"""
+
+CATEGORY_CATALOG_QUERY = f"""
+    SELECT cc.category, COUNT(*) AS count,
+    MIN(c.start_date)::date AS first_start_date, MAX(c.end_date)::date AS last_end_date
+    FROM {config.CATEGORIES_TABLE} cc
+    JOIN {config.CONFERENCE_LINKS_TABLE} l ON l.category_id = cc.id
+    JOIN {config.CONFERENCES_TABLE} c ON c.id = l.conference_id
+    GROUP BY cc.category
+    ORDER BY cc.category;
+"""
+
+
+# Search candidates from the published snapshot, whose tables carry trigram indexes on
+# lower(name) and lower(abbreviation). Parameters: the search text (twice) and the abbreviation prefix
+# pattern for the score, then the prefix pattern and the search text (twice) for the WHERE clause
+SEARCH_SELECT = f"""
+    SELECT s.*,
+    (s.cfp_deadline IS NULL OR s.cfp_deadline <= NOW()) as past_submission_date,
+    GREATEST(
+        word_similarity(%s, lower(s.name)),
+        word_similarity(%s, lower(s.abbreviation)),
+        CASE WHEN lower(s.abbreviation) LIKE %s THEN 1.0 ELSE 0.0 END
+    ) AS score
+    FROM {config.MARKER_SNAPSHOT_TABLE} s
+    WHERE (lower(s.abbreviation) LIKE %s OR %s <%% lower(s.name) OR %s <%% lower(s.abbreviation))
+"""
+
+
+def marker_filters(query):
+    """
+    SQL conditions on conferences (aliased c) and their parameters for a validated ConferenceQuery.
+    """
+    # Category membership is resolved through the link table, so the cost of a single query
+    # doesn't grow with the number of selected categories
+    conditions = [f"""
+        EXISTS (
+            SELECT 1
+            FROM {config.CONFERENCE_LINKS_TABLE} l
+            JOIN {config.CATEGORIES_TABLE} cc ON cc.id = l.category_id
+            WHERE l.conference_id = c.id AND cc.category = ANY(%s)
+        )
+    """]
+    params = [query.categories]
+
+    if query.start_date:
+        conditions.append("c.start_date >= %s::date")
+        params.append(query.start_date)
+    if query.end_date:
+        conditions.append("c.end_date <= %s::date")
+        params.append(query.end_date)
+    if query.open_cfp:
+        # CFP deadlines are parsed by the scraper at ingest; unparseable ones are NULL
+        conditions.append("c.cfp_deadline > NOW()")
+    if query.bbox:
+        # Matches the GiST index on point(lon, lat)
+        conditions.append("(" + " OR ".join(
+            "point(c.lon, c.lat) <@ box(point(%s, %s), point(%s, %s))" for _ in query.bbox_boxes()
+        ) + ")")
+        for box in query.bbox_boxes():
+            params.extend(box)
+
+    return " AND ".join(conditions), params
+
+
+def markers_query(query):
+    """
+    Marker query and parameters for a validated ConferenceQuery, in id order. When the query has a
+    limit, one extra row is fetched to tell whether there is another page (see page_rows).
+    """
+    conditions, params = marker_filters(query)
+    if query.after_id is not None:
+        conditions += " AND c.id > %s"
+        params.append(query.after_id)
+    sql_query = f"{MARKERS_SELECT} WHERE {conditions} ORDER BY c.id"
+    if query.limit:
+        sql_query += " LIMIT %s"
+        params.append(query.limit + 1)
+    return sql_query, params
+
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_query(query):
+    """
+    Search query and parameters for a validated SearchQuery: conferences whose abbreviation starts
+    with the search text, or whose name or abbreviation contains a close (trigram) match for it,
+    best matches first. The same category, date and CFP filters as markers apply.
+    """
+    prefix = escape_like(query.q) + "%"
+    conditions = []
+    params = [query.q, query.q, prefix, prefix, query.q, query.q]
+    if query.categories:
+        conditions.append(f"""
+            s.category_ids && ARRAY(SELECT id FROM {config.CATEGORIES_TABLE} WHERE category = ANY(%s))
+        """)
+        params.append(query.categories)
+    if query.start_date:
+        conditions.append("s.start_date >= %s::date")
+        params.append(query.start_date)
+    if query.end_date:
+        conditions.append("s.end_date <= %s::date")
+        params.append(query.end_date)
+    if query.open_cfp:
+        conditions.append("s.cfp_deadline > NOW()")
+
+    sql_query = SEARCH_SELECT + "".join(f" AND {condition}" for condition in conditions)
+    sql_query += " ORDER BY score DESC, s.start_date, s.id LIMIT %s"
+    return sql_query, params + [query.limit]
+
+
+def search_rows(rows, query):
+    """
+    Project the rows returned by a search_query onto the query's fields, keeping each match's score.
+    """
+    fields = query.marker_fields()
+    return [dict({f: row[f] for f in fields}, score=round(float(row['score']), 4)) for row in rows]
+
+
+def clusters_query(query):
+    """
+    Query grouping matching conferences into grid cells, whose size halves with every zoom level,
+    returning each non-empty cell's conference count and mean position.
+    """
+    conditions, params = marker_filters(query)
+    cell = config.CLUSTER_CELL_DEGREES / 2 ** query.zoom
+    sql_query = f"""
+        SELECT COUNT(*) AS count, AVG(c.lat) AS lat, AVG(c.lon) AS lon
+        FROM {config.CONFERENCES_TABLE} c
+        WHERE {conditions}
+        GROUP BY FLOOR(c.lon / %s), FLOOR(c.lat / %s)
+    """
+    return sql_query, params + [cell, cell]
+
+
+def page_rows(rows, query):
+    """
+    Trim the rows returned by a markers_query to the query's page and fields, returning the
+    records and the id to resume after, as MarkerSnapshot.markers does.
+    """
+    next_after_id = None
+    if query.limit and len(rows) > query.limit:
+        rows = rows[:query.limit]
+        next_after_id = rows[-1]['id']
+    fields = query.marker_fields()
+    return [{f: row[f] for f in fields} for row in rows], next_after_id
+
+
+def to_asyncpg(sql_query):
+    """
+    Rewrite psycopg2's %s placeholders as asyncpg's numbered $1, $2, ... placeholders, and its
+    escaped %% (e.g. pg_trgm's <% operator) as a literal %.
+    """
+    counter = iter(range(1, sql_query.count("%s") + 1))
+    return re.sub(r"%%|%s", lambda m: "%" if m.group() == "%%" else f"${next(counter)}", sql_query)
@@ -0,0 +1,71 @@
+from itertools import islice
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import config
+
+
+def prefers_ndjson(accept):
+    """
+    Whether an Accept header value prefers newline-delimited JSON to a JSON array, negotiated as
+    Flask's request.accept_mimetypes does, so both servers agree.
+    """
+    best = parse_accept_header(accept, MIMEAccept).best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+
+def encode_markers(records, query):
+    """
+    Lay out marker records as requested: a list of objects, or one array per field.
+    """
+    if query.layout == 'columns':
+        return {f: [record[f] for record in records] for f in query.marker_fields()}
+    return records
+
+
+def encode_catalog(catalog, detail):
+    """
+    Category names in display case, or with detail, the full catalog entries.
+    """
+    if detail:
+        return [dict(c, category=c['category'].title()) for c in catalog]
+    return [c['category'].title() for c in catalog]
+
+
+def iso_dates(rows):
+    """
+    Render the date range columns of category catalog rows read from the database as ISO dates,
+    matching MarkerSnapshot.catalog.
+    """
+    rows = [dict(row) for row in rows]
+    for row in rows:
+        for column in ("first_start_date", "last_end_date"):
+            row[column] = row[column].isoformat() if row[column] else None
+    return rows
+
+
+def encode_chunk(records, dumps, ndjson=False, first=False):
+    """
+    Encode one chunk of a streamed response: newline-terminated JSON documents, or the
+    comma-separated elements of a JSON array (preceded by a comma unless it's the first chunk).
+    """
+    if ndjson:
+        return "".join(dumps(record) + "\n" for record in records)
+    return ("" if first else ",") + ",".join(dumps(record) for record in records)
+
+
+def stream_json(records, dumps, ndjson=False):
+    """
+    Encode records incrementally with dumps, as one JSON array or as newline-delimited JSON,
+    a chunk of MARKERS_STREAM_CHUNK_SIZE records at a time.
+    """
+    records = iter(records)
+    if not ndjson:
+        yield "["
+    first = True
+    while chunk := list(islice(records, config.MARKERS_STREAM_CHUNK_SIZE)):
+        yield encode_chunk(chunk, dumps, ndjson, first)
+        first = False
+    if not ndjson:
+        yield "]"
@@ -0,0 +1,262 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from psycopg2 import errors
+from psycopg2.extras import RealDictCursor
+
+import config
+from db import fetch_data_version, get_db_connection
+
+
+# Snapshot columns returned for each marker, in the order the scraper's view defines them
+MARKER_COLUMNS = [
+    "id", "abbreviation", "name", "dates", "start_date", "end_date", "location",
+    "cfp", "cfp_deadline", "cfp_parse_status", "lat", "lon"
+]
+
+# Fields a client may select; past_submission_date is computed per request
+MARKER_FIELDS = MARKER_COLUMNS + ["past_submission_date"]
+
+
+def to_datetime64(values):
+    return np.array([np.datetime64(v, "s") if v is not None else np.datetime64("NaT") for v in values])
+
+
+def to_float64(values):
+    return np.array([v if v is not None else np.nan for v in values], dtype=np.float64)
+
+
+def date_range(starts, ends):
+    """
+    Earliest start and latest end date, as ISO date strings, ignoring missing dates.
+    """
+    starts, ends = starts[~np.isnat(starts)], ends[~np.isnat(ends)]
+    return (
+        str(np.datetime_as_string(starts.min(), unit="D")) if len(starts) else None,
+        str(np.datetime_as_string(ends.max(), unit="D")) if len(ends) else None,
+    )
+
+
+class MarkerSnapshot:
+    """
+    Immutable, column-oriented copy of the marker snapshot published by the scraper.
+
+    Dates, CFP deadlines and coordinates are held as numpy arrays, and category membership as a
+    boolean matrix (one column per category), so a query is answered with a handful of vectorized
+    masks. Marker records are built once at load time and only picked out per request.
+    """
+
+    def __init__(self, version, rows, categories):
+        self.version = version
+        self.records = [{column: row[column] for column in MARKER_COLUMNS} for row in rows]
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.start_date = to_datetime64([row["start_date"] for row in rows])
+        self.end_date = to_datetime64([row["end_date"] for row in rows])
+        self.cfp_deadline = to_datetime64([row["cfp_deadline"] for row in rows])
+        self.lat = to_float64([row["lat"] for row in rows])
+        self.lon = to_float64([row["lon"] for row in rows])
+
+        # Category name -> column of the membership matrix
+        self.category_index = {name: i for i, (category_id, name) in enumerate(categories)}
+        columns = {category_id: i for i, (category_id, name) in enumerate(categories)}
+        self.membership = np.zeros((len(rows), len(categories)), dtype=bool)
+        for i, row in enumerate(rows):
+            self.membership[i, [columns[c] for c in row["category_ids"] if c in columns]] = True
+        self.catalog = self.build_catalog()
+
+    def __len__(self):
+        return len(self.records)
+
+    def build_catalog(self):
+        """
+        Per-category conference counts and date ranges, for categories with at least one conference.
+        """
+        catalog = []
+        for name, column in sorted(self.category_index.items()):
+            members = self.membership[:, column]
+            count = int(members.sum())
+            if not count:
+                continue
+            first_start_date, last_end_date = date_range(self.start_date[members], self.end_date[members])
+            catalog.append({
+                "category": name, "count": count,
+                "first_start_date": first_start_date, "last_end_date": last_end_date,
+            })
+        return catalog
+
+    def mask(self, query):
+        """
+        Boolean mask of the conferences matching a validated ConferenceQuery.
+        Missing values (NaT/NaN) never satisfy a comparison, as with NULLs in SQL.
+        """
+        columns = [self.category_index[name] for name in query.categories if name in self.category_index]
+        if not columns:
+            return np.zeros(len(self), dtype=bool)
+        mask = self.membership[:, columns].any(axis=1)
+
+        if query.start_date:
+            mask &= self.start_date >= np.datetime64(query.start_date)
+        if query.end_date:
+            mask &= self.end_date <= np.datetime64(query.end_date)
+        if query.open_cfp:
+            mask &= self.cfp_deadline > np.datetime64(datetime.now(), "s")
+        if query.bbox:
+            in_box = np.zeros(len(self), dtype=bool)
+            for west, south, east, north in query.bbox_boxes():
+                in_box |= (self.lon >= west) & (self.lon <= east) & (self.lat >= south) & (self.lat <= north)
+            mask &= in_box
+        return mask
+
+    def page(self, query):
+        """
+        Indices of the conferences matching the query in id order, after the query's after_id and
+        up to its limit, along with the id to resume after if the limit cut the page short.
+        """
+        mask = self.mask(query)
+        if query.after_id is not None:
+            mask &= self.ids > query.after_id
+        indices = np.flatnonzero(mask)
+        next_after_id = None
+        if query.limit and len(indices) > query.limit:
+            indices = indices[:query.limit]
+            next_after_id = int(self.ids[indices[-1]])
+        return indices, next_after_id
+
+    def iter_markers(self, indices, fields):
+        """
+        Lazily yield the marker records at indices, projected onto fields. past_submission_date,
+        if selected, flags whether the conference's submission deadline has passed.
+        """
+        columns = [f for f in fields if f != "past_submission_date"]
+        past = None
+        if "past_submission_date" in fields:
+            deadlines = self.cfp_deadline[indices]
+            past = (np.isnat(deadlines) | (deadlines <= np.datetime64(datetime.now(), "s"))).tolist()
+        for n, i in enumerate(indices.tolist()):
+            record = {f: self.records[i][f] for f in columns}
+            if past is not None:
+                record["past_submission_date"] = past[n]
+            yield record
+
+    def markers(self, query):
+        """
+        Page of marker records for the query, and the id to resume after (see page).
+        """
+        indices, next_after_id = self.page(query)
+        return list(self.iter_markers(indices, query.marker_fields())), next_after_id
+
+    def clusters(self, query):
+        """
+        Group matching conferences into grid cells whose size halves with every zoom level,
+        returning each non-empty cell's conference count and mean position.
+        """
+        mask = self.mask(query) & ~np.isnan(self.lat) & ~np.isnan(self.lon)
+        lat, lon = self.lat[mask], self.lon[mask]
+        if not len(lat):
+            return []
+        cell = config.CLUSTER_CELL_DEGREES / 2 ** query.zoom
+        cells = np.stack([np.floor(lon / cell), np.floor(lat / cell)], axis=1)
+        _, group = np.unique(cells, axis=0, return_inverse=True)
+        group = group.ravel()
+        counts = np.bincount(group)
+        lats = np.bincount(group, weights=lat) / counts
+        lons = np.bincount(group, weights=lon) / counts
+        return [
+            {"count": count, "lat": la, "lon": lo}
+            for count, la, lo in zip(counts.tolist(), lats.tolist(), lons.tolist())
+        ]
+
+
+def load_snapshot():
+    """
+    Read the published snapshot and the data version it belongs to in a single repeatable-read
+    transaction, so the pair is always consistent. Returns None if the scraper hasn't published
+    a snapshot yet.
+    """
+    with get_db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+        try:
+            cur.execute(f"SELECT version FROM {config.DATA_VERSION_TABLE};")
+            row = cur.fetchone()
+            version = row["version"] if row else 0
+            cur.execute(f"SELECT * FROM {config.MARKER_SNAPSHOT_TABLE} ORDER BY id;")
+            rows = cur.fetchall()
+            cur.execute(f"SELECT id, category FROM {config.CATEGORIES_TABLE} ORDER BY id;")
+            categories = [(c["id"], c["category"]) for c in cur.fetchall()]
+        except errors.UndefinedTable:
+            return None
+    return MarkerSnapshot(version, rows, categories)
+
+
+class SnapshotStore:
+    """
+    Holds the current MarkerSnapshot and swaps in a new one when the data version changes.
+
+    The version is polled at most once per check interval. A new snapshot is loaded by one request
+    thread while the others keep answering from the previous one, and is published with a single
+    reference assignment, so there's no window in which no snapshot is available.
+    """
+
+    def __init__(self, version_check_interval):
+        self.version_check_interval = version_check_interval
+        self.snapshot = None
+        self.version = None
+        self._version_checked = 0.0
+        self._load_lock = threading.Lock()
+
+        # Metrics
+        self.loads = 0
+        self.load_seconds_last = 0.0
+
+    def current(self):
+        """
+        Return the snapshot for the latest data version, or None if none has been published
+        (in which case callers fall back to querying the database).
+        """
+        if not self.check_due():
+            return self.snapshot
+        version = fetch_data_version()
+        if version == self.version:
+            return self.snapshot
+
+        # Only one thread loads; the rest carry on with the current snapshot unless there is none yet
+        if not self._load_lock.acquire(blocking=self.snapshot is None):
+            return self.snapshot
+        try:
+            if version != self.version:
+                start = time.monotonic()
+                self.publish(load_snapshot(), version, time.monotonic() - start)
+        finally:
+            self._load_lock.release()
+        return self.snapshot
+
+    def check_due(self):
+        """
+        Whether the data version should be polled now, i.e. the last check is older than the check interval.
+        """
+        now = time.monotonic()
+        if now - self._version_checked < self.version_check_interval:
+            return False
+        self._version_checked = now
+        return True
+
+    def publish(self, snapshot, version, load_seconds):
+        """
+        Swap in a newly loaded snapshot (or None, if none has been published for this version).
+        """
+        self.load_seconds_last = load_seconds
+        self.loads += 1
+        self.snapshot = snapshot
+        self.version = snapshot.version if snapshot else version
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "data_version": self.version,
+            "conferences": len(snapshot) if snapshot else None,
+            "categories": len(snapshot.catalog) if snapshot else None,
+            "loads": self.loads,
+            "load_seconds_last": round(self.load_seconds_last, 6),
+        }
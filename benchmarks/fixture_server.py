@@ -0,0 +1,94 @@
+"""
+Local HTTP server mimicking WikiCFP's category listing pages, for crawling benchmarks.
+
+Pages have the markup WikiCFPSpider parses: a table in div.contsec listing each conference over two
+rows, and a "next" link until the last page. Content is deterministic per category and page, and
+pages carry an ETag, so incremental crawls see 304s and unchanged hashes on re-runs. Point the
+spider at it with:
+
+    SCRAPER_DOMAIN=localhost SCRAPER_START_URL="http://localhost:8001/cfp/call?conference={}"
+
+    python benchmarks/fixture_server.py --port 8001 --pages 5 --per-page 20
+"""
+import argparse
+import hashlib
+import html
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+from fixtures import category_conferences, listing_rows
+
+
+def listing_page(category, page, pages, per_page, seed):
+    """
+    HTML for one page of a category's listing.
+    """
+    conferences = category_conferences(category, pages * per_page, seed)[(page - 1) * per_page:page * per_page]
+    rows = ['<tr bgcolor="#bbbbbb"><td>Event</td><td>When</td><td>Where</td><td>Deadline</td></tr>']
+    for conference in conferences:
+        for row in listing_rows(conference):
+            cells = "".join(f"<td>{html.escape(cell)}</td>" for cell in row)
+            rows.append(f"<tr bgcolor=\"#f6f6f6\">{cells}</tr>")
+    next_link = ""
+    if page < pages:
+        next_link = f'<a href="/cfp/call?conference={quote(category)}&amp;page={page + 1}">next</a>'
+    return f"""<html><body>
+<div class="contsec"><center><form><table cellpadding="3" cellspacing="1" align="center" width="100%">
+{"".join(rows)}
+</table></form></center>{next_link}</div>
+</body></html>"""
+
+
+def make_handler(pages, per_page, seed, latency):
+    class WikiCFPHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path != "/cfp/call" or "conference" not in params:
+                self.send_error(404)
+                return
+            page = int(params.get("page", ["1"])[0])
+            if not 1 <= page <= pages:
+                self.send_error(404)
+                return
+            if latency:
+                time.sleep(latency)
+
+            body = listing_page(params["conference"][0], page, pages, per_page, seed).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return WikiCFPHandler
+
+
+def serve(port, pages, per_page, seed=0, latency=0.0):
+    """
+    Start the fixture server; the caller runs serve_forever (e.g. in a thread) and shuts it down.
+    """
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(pages, per_page, seed, latency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve WikiCFP-like listing pages.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--pages", type=int, default=5, help="Listing pages per category")
+    parser.add_argument("--per-page", type=int, default=20, help="Conferences per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each page")
+    args = parser.parse_args()
+    print(f"WikiCFP fixture server listening on http://127.0.0.1:{args.port}/cfp/call?conference=...")
+    serve(args.port, args.pages, args.per_page, args.seed, args.latency).serve_forever()
@@ -0,0 +1,112 @@
+"""
+Deterministic synthetic conference data shared by the dataset generator, the WikiCFP fixture server
+and the stub geocoder. The same seed always produces the same conferences.
+"""
+import hashlib
+import random
+from datetime import date, timedelta
+
+# The 24 scraper categories (mirrors CATEGORIES in scraper-backend/config.py, which can't be imported
+# alongside the API's config module)
+CATEGORIES = [
+    'artificial intelligence', 'computer science', 'machine learning', 'engineering', 'information technology',
+    'education', 'software engineering', 'security', 'data mining', 'communications', 'big data', 'robotics',
+    'cloud computing', 'image processing', 'signal processing', 'computer vision', 'multimedia', 'humanities',
+    'bioinformatics', 'medicine', 'medical', 'health informatics', 'social networks', 'social media',
+]
+
+# Locations as they'd appear in WikiCFP listings, with coordinates for the stub geocoder
+CITIES = {
+    "Vienna, Austria": (48.2082, 16.3738),
+    "Paris, France": (48.8566, 2.3522),
+    "Berlin, Germany": (52.5200, 13.4050),
+    "Barcelona, Spain": (41.3874, 2.1686),
+    "Lisbon, Portugal": (38.7223, -9.1393),
+    "London, UK": (51.5072, -0.1276),
+    "Singapore": (1.3521, 103.8198),
+    "Tokyo, Japan": (35.6762, 139.6503),
+    "Seoul, South Korea": (37.5665, 126.9780),
+    "Sydney, Australia": (-33.8688, 151.2093),
+    "Toronto, Canada": (43.6532, -79.3832),
+    "San Francisco, CA, USA": (37.7749, -122.4194),
+    "New York, NY, USA": (40.7128, -74.0060),
+    "Honolulu, HI, USA": (21.3069, -157.8583),
+    "Sao Paulo, Brazil": (-23.5558, -46.6396),
+    "Cape Town, South Africa": (-33.9249, 18.4241),
+    "Dubai, UAE": (25.2048, 55.2708),
+    "Bangalore, India": (12.9716, 77.5946),
+    "Auckland, New Zealand": (-36.8485, 174.7633),
+    "Virtual Conference": None,
+}
+
+DATE_FORMAT = "%b %d, %Y"
+
+
+def category_rng(category, seed, salt=""):
+    digest = hashlib.sha1(f"{seed}:{category}:{salt}".encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def synthetic_conference(i, rng):
+    """
+    One synthetic conference, with the raw string fields WikiCFP lists and the parsed values
+    the cleaner would derive from them.
+    """
+    start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 3 * 365))
+    end = start + timedelta(days=rng.randint(0, 4))
+    deadline = start - timedelta(days=rng.randint(30, 240))
+    location = rng.choice(list(CITIES))
+    has_deadline = rng.random() < 0.9
+    abbreviation = f"SYN{i} {start.year}"
+    return {
+        "abbreviation": abbreviation,
+        "name": f"Synthetic Conference {i} on Topic {rng.randint(1, 500)}",
+        "dates": f"{start.strftime(DATE_FORMAT)} - {end.strftime(DATE_FORMAT)}",
+        "start_date": start,
+        "end_date": end,
+        "location": location,
+        "cfp": deadline.strftime(DATE_FORMAT) if has_deadline else "TBD",
+        "cfp_deadline": deadline if has_deadline else None,
+        "coordinates": CITIES[location],
+    }
+
+
+def category_conferences(category, count, seed=0):
+    """
+    The synthetic conferences listed under a category. Conference numbers overlap between
+    categories, as real WikiCFP listings do.
+    """
+    rng = category_rng(category, seed)
+    numbers = rng.sample(range(count * 4), count)
+    return [synthetic_conference(i, category_rng(str(i), seed, "conference")) for i in numbers]
+
+
+def listing_rows(conference):
+    """
+    The cells of the two table rows WikiCFP uses per conference.
+    """
+    return [
+        [conference["abbreviation"], conference["name"]],
+        [conference["dates"], conference["location"], conference["cfp"]],
+    ]
+
+
+def raw_item(conference):
+    """
+    The item the spider extracts for a conference, as stored in the raw tables.
+    """
+    return {field: conference[field] for field in ("abbreviation", "name", "dates", "location", "cfp")}
+
+
+def stub_coordinates(query):
+    """
+    Coordinates for a location query: the known city's, or a deterministic point derived from the
+    query's hash (None for queries containing "nowhere", to exercise not-found handling).
+    """
+    for city, coordinates in CITIES.items():
+        if city.lower() == query.strip().lower():
+            return coordinates
+    if "nowhere" in query.lower():
+        return None
+    digest = int(hashlib.sha1(query.lower().encode()).hexdigest()[:12], 16)
+    return (digest % 18000) / 100 - 90, (digest // 18000 % 36000) / 100 - 180
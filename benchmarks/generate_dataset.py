@@ -0,0 +1,79 @@
+"""
+Fill a local Postgres database with N synthetic conferences across the scraper's 24 categories, and
+publish them as a marker snapshot, as a refresh would. Runs against the database in DB_NAME/DB_HOST;
+use a scratch database, since --reset empties the conference tables.
+
+    DB_NAME=conference_mapper_bench python benchmarks/generate_dataset.py 50000 --reset
+"""
+import argparse
+import time
+
+from fixtures import CATEGORIES, category_rng, synthetic_conference
+from harness import use_backend
+
+use_backend("scraper")
+
+from psycopg2.extras import execute_values  # noqa: E402
+
+import config  # noqa: E402
+from database_update import create_conference_tables, get_db_connection, initialize_tables, publish_snapshot  # noqa: E402
+from parsing import conference_identity  # noqa: E402
+
+
+def generate(count, seed=0, reset=False, batch_size=5000):
+    """
+    Insert count synthetic conferences, each linked to one to three categories, then publish them.
+    Returns the number of conferences inserted.
+    """
+    initialize_tables()
+    create_conference_tables()
+    conn, cur = get_db_connection()
+    if reset:
+        cur.execute(f"TRUNCATE {config.CONFERENCES_TABLE}, {config.CONFERENCE_LINKS_TABLE} RESTART IDENTITY;")
+    cur.execute(f"SELECT category, id FROM {config.CATEGORIES_TABLE} WHERE category = ANY(%s);", (CATEGORIES,))
+    category_ids = dict(cur.fetchall())
+
+    inserted = 0
+    for offset in range(0, count, batch_size):
+        conferences, categories = [], {}
+        for i in range(offset, min(count, offset + batch_size)):
+            rng = category_rng(str(i), seed, "conference")
+            conference = synthetic_conference(i, rng)
+            lat, lon = conference["coordinates"] or (None, None)
+            key = conference_identity(conference["name"], conference["abbreviation"], conference["start_date"])
+            conferences.append((
+                key, conference["abbreviation"], conference["name"], conference["dates"],
+                conference["start_date"], conference["end_date"], conference["location"], conference["cfp"],
+                conference["cfp_deadline"], "parsed" if conference["cfp_deadline"] else "invalid", lat, lon
+            ))
+            categories[key] = rng.sample(CATEGORIES, rng.randint(1, 3))
+
+        ids = execute_values(cur, f"""
+            INSERT INTO {config.CONFERENCES_TABLE}
+            (identity_key, abbreviation, name, dates, start_date, end_date, location, cfp, cfp_deadline,
+             cfp_parse_status, lat, lon)
+            VALUES %s ON CONFLICT (identity_key) DO NOTHING RETURNING id, identity_key;
+        """, conferences, page_size=batch_size, fetch=True)
+        links = [(conference_id, category_ids[c]) for conference_id, key in ids for c in categories[key]]
+        execute_values(cur, f"""
+            INSERT INTO {config.CONFERENCE_LINKS_TABLE} (conference_id, category_id) VALUES %s
+            ON CONFLICT DO NOTHING;
+        """, links, page_size=batch_size)
+        conn.commit()
+        inserted += len(ids)
+    conn.close()
+
+    publish_snapshot()
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic conference dataset.")
+    parser.add_argument("count", type=int, help="Number of conferences to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="Empty the conference tables first")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    inserted = generate(args.count, args.seed, args.reset)
+    print(f"Inserted {inserted} synthetic conferences into {config.DB_NAME} in {time.monotonic() - start:.1f}s.")
@@ -0,0 +1,115 @@
+"""
+Timing and result helpers shared by the benchmark scenarios.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def use_backend(name):
+    """
+    Make one backend's modules importable. The API and the scraper each have their own config
+    module, so a process can only ever use one of them.
+    """
+    sys.path.insert(0, str(ROOT / f"{name}-backend"))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+class Stage:
+    """
+    Latencies, item counts and (when tracemalloc is running) peak Python memory of one benchmarked stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.items = 0
+        self.peak_bytes = None
+
+    @contextmanager
+    def measure(self, items=1):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+        if tracing:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            self.peak_bytes = max(self.peak_bytes or 0, peak)
+
+    def record(self, seconds, items=1):
+        """
+        Add a latency measured elsewhere, e.g. in a child process.
+        """
+        self.latencies.append(seconds)
+        self.items += items
+
+    def summary(self):
+        seconds = sum(self.latencies)
+        p50, p99 = percentile(self.latencies, 0.50), percentile(self.latencies, 0.99)
+        return {
+            "stage": self.name,
+            "calls": len(self.latencies),
+            "items": self.items,
+            "seconds": round(seconds, 6),
+            "items_per_sec": round(self.items / seconds, 3) if seconds else None,
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 3) if p99 is not None else None,
+            "peak_memory_mb": round(self.peak_bytes / 2 ** 20, 3) if self.peak_bytes is not None else None,
+        }
+
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size of this process (or of its waited-for children), in MB.
+    """
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(usage.ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, scenarios, params):
+    """
+    Write scenario results as JSON, with enough context to compare runs across commits.
+    """
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": os.getenv("DB_NAME", "conference_mapper"),
+        "params": params,
+        "scenarios": scenarios,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    return results
@@ -0,0 +1,111 @@
+"""
+Load benchmark for the API's /api/markers endpoint, using only the standard library.
+
+Runs a fixed number of concurrent clients against one or more API base URLs (e.g. the Flask dev
+server and the ASGI server) for a fixed duration each, and reports throughput and latency percentiles.
+
+    python benchmarks/load_api.py http://localhost:5000 http://localhost:5001 --concurrency 32 --duration 20
+
+By default every request uses a random category selection, so most requests are served from the
+response cache after warm-up. Pass --cold to add a random end date to every request, so responses
+are mostly built from scratch.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+
+def fetch_categories(base_url):
+    with urllib.request.urlopen(f"{base_url}/api/categories") as response:
+        return json.load(response)
+
+
+def random_query(categories, cold):
+    query = {
+        "categories": random.sample(categories, random.randint(1, min(5, len(categories)))),
+        "open_cfp": random.random() < 0.3,
+    }
+    if cold:
+        query["end_date"] = (date.today() + timedelta(days=random.randint(0, 730))).isoformat()
+    return query
+
+
+def worker(base_url, categories, cold, deadline, latencies, errors, lock):
+    while time.monotonic() < deadline:
+        body = json.dumps(random_query(categories, cold)).encode()
+        request = urllib.request.Request(
+            f"{base_url}/api/markers", data=body, method="POST",
+            headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+        )
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            with lock:
+                errors.append(time.monotonic() - start)
+            continue
+        with lock:
+            latencies.append(time.monotonic() - start)
+
+
+def run(base_url, concurrency, duration, cold):
+    categories = fetch_categories(base_url)
+    if not categories:
+        raise SystemExit(f"{base_url} has no categories to query")
+
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, categories, cold, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 2),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        "latency_ms_p50": percentile(0.50),
+        "latency_ms_p95": percentile(0.95),
+        "latency_ms_p99": percentile(0.99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /api/markers on one or more API servers.")
+    parser.add_argument("urls", nargs="+", help="API base URLs, e.g. http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds to run against each URL")
+    parser.add_argument("--cold", action="store_true", help="Vary the date filter to defeat the response cache")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = [run(url, args.concurrency, args.duration, args.cold) for url in args.urls]
+
+    print(f"{'url':<32}{'req/s':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for result in results:
+        # Latencies are only recorded for successful requests, so there are none if every request failed
+        p50, p95, p99 = (
+            "n/a" if result[key] is None else result[key] for key in ("latency_ms_p50", "latency_ms_p95", "latency_ms_p99")
+        )
+        print(f"{result['url']:<32}{result['requests_per_sec']:>10}{result['errors']:>8}{p50:>10}{p95:>10}{p99:>10}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark of WikiCFPSpider's listing page parsing, over saved HTML pages. Compares the spider's
+single-pass extraction (scraper.extract_conferences) against the previous approach of one XPath
+string(.) evaluation per cell, joined into a delimited string per row. Needs no database or network.
+
+Pages are read from --html-dir (e.g. WikiCFP pages saved with a browser or curl), or generated with
+the fixture server's markup; --save writes the generated pages out, to reuse as fixtures:
+
+    python benchmarks/parser_bench.py --pages 200 --per-page 100
+    python benchmarks/parser_bench.py --html-dir ~/wikicfp-pages --output benchmarks/results/parser.json
+
+Reports pages/sec and p50/p99 latency per page, then, in a separate pass with tracemalloc running,
+the peak memory allocated while parsing one page.
+"""
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from fixture_server import listing_page
+from fixtures import CATEGORIES
+from harness import Stage, use_backend, write_results
+
+use_backend("scraper")
+
+from parsel import Selector  # noqa: E402
+
+from scraper import extract_conferences  # noqa: E402
+
+TABLE_XPATH = '//div[@class="contsec"]//table[@cellpadding="3" and @cellspacing="1"]'
+
+
+def xpath_rows(html):
+    """
+    The previous parsing path: an XPath evaluation per cell, with each row's cells joined by "||||".
+    """
+    table = Selector(text=html).xpath(TABLE_XPATH)
+    return [
+        "||||".join(cell.xpath('string(.)').get().strip() for cell in row.xpath('.//td'))
+        for row in table.xpath('.//tr[position() > 1]')
+    ]
+
+
+def single_pass(html):
+    table = Selector(text=html).xpath(TABLE_XPATH)
+    return extract_conferences(table[0].root) if table else []
+
+
+PARSERS = {"xpath_per_cell": xpath_rows, "single_pass": single_pass}
+
+
+def load_pages(args):
+    if args.html_dir:
+        return [path.read_text(errors="replace") for path in sorted(Path(args.html_dir).glob("*.html"))]
+    # A single-page listing per (category, seed), so every page lists different conferences
+    return [
+        listing_page(CATEGORIES[i % len(CATEGORIES)], 1, 1, args.per_page, args.seed + i // len(CATEGORIES))
+        for i in range(args.pages)
+    ]
+
+
+def run(pages, rounds, trace):
+    stages = []
+    for name, parse in PARSERS.items():
+        stage = Stage(f"{name}_memory" if trace else name)
+        for _ in range(rounds):
+            for html in pages:
+                with stage.measure():
+                    parse(html)
+        stages.append(stage)
+    return stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark WikiCFP listing page parsing.")
+    parser.add_argument("--html-dir", help="Directory of saved listing pages (*.html) to parse")
+    parser.add_argument("--pages", type=int, default=100, help="Pages to generate, without --html-dir")
+    parser.add_argument("--per-page", type=int, default=100, help="Conferences per generated page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3, help="Times each page is parsed per parser")
+    parser.add_argument("--save", help="Write the generated pages to this directory")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        raise SystemExit(f"No *.html pages found in {args.html_dir}")
+    if args.save:
+        Path(args.save).mkdir(parents=True, exist_ok=True)
+        for i, html in enumerate(pages):
+            Path(args.save, f"page_{i:04d}.html").write_text(html)
+
+    # Both parsers must agree on the conferences listed before their speed is worth comparing
+    for html in pages:
+        rows = [row.split("||||") for row in xpath_rows(html) if "||||" in row]
+        conferences = single_pass(html)
+        assert len(conferences) == len(rows) // 2, "parsers disagree on the number of conferences"
+
+    stages = run(pages, args.rounds, trace=False)
+    tracemalloc.start()
+    stages += run(pages, 1, trace=True)
+    tracemalloc.stop()
+
+    print(f"{len(pages)} pages, {sum(len(html) for html in pages) / len(pages) / 1024:.1f} KiB each on average")
+    for stage in stages:
+        summary = stage.summary()
+        if summary["peak_memory_mb"] is None:
+            print(
+                f"  {summary['stage']:<22}{summary['items_per_sec']:>12} pages/s"
+                f"  p50 {summary['p50_ms']} ms  p99 {summary['p99_ms']} ms"
+            )
+        else:
+            print(f"  {summary['stage']:<22}{summary['peak_memory_mb'] * 1024:>12.1f} KiB peak allocation per page")
+    if args.output:
+        write_results(args.output, [{"scenario": "parser", "stages": [stage.summary() for stage in stages]}],
+                      {k: v for k, v in vars(args).items() if k != "output"})
+        print(f"Results written to {args.output}")
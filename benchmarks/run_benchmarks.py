@@ -0,0 +1,316 @@
+"""
+Scripted benchmark scenarios for the API and the refresh pipeline. Each scenario runs in its own
+process, reports throughput, p50/p99 latency and peak memory per stage, and the combined results are
+written as JSON for comparison across commits.
+
+Scenarios write to the database, so run them against a scratch database filled by generate_dataset.py:
+
+    DB_NAME=conference_mapper_bench python benchmarks/generate_dataset.py 50000 --reset
+    DB_NAME=conference_mapper_bench python benchmarks/run_benchmarks.py --output benchmarks/results/latest.json
+
+Scenarios:
+- api_snapshot: load the marker snapshot, then filter, project and serialize random queries from memory
+- api_markers: POST /api/markers through the Flask app, cold (uncached) and warm, plus the SQL fallback
+- pipeline_insert: write synthetic raw items through the scraper's PostgreSQLPipeline
+- clean: clean synthetic raw tables with a stub geocoder
+- refresh: crawl the local WikiCFP fixture server and clean the results, as database_update.py does
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from fixtures import CATEGORIES, category_conferences, raw_item
+from harness import Stage, peak_rss_mb, use_backend, write_results
+
+SCENARIOS = {
+    "api_snapshot": "api",
+    "api_markers": "api",
+    "pipeline_insert": "scraper",
+    "clean": "scraper",
+    "refresh": "scraper",
+}
+
+
+def random_query(rng, cold=False):
+    query = {
+        "categories": rng.sample(CATEGORIES, rng.randint(1, 5)),
+        "open_cfp": rng.random() < 0.3,
+    }
+    if cold:
+        # Distinct date filters defeat the response cache
+        query["end_date"] = (date(2025, 1, 1) + timedelta(days=rng.randint(0, 1500))).isoformat()
+    return query
+
+
+def api_snapshot(args):
+    import app
+    from models import ConferenceQuery
+    from snapshot import load_snapshot
+
+    load, filter_, project, serialize = Stage("snapshot_load"), Stage("filter"), Stage("project"), Stage("serialize")
+    with load.measure():
+        snapshot = load_snapshot()
+    if snapshot is None:
+        raise SystemExit("No marker snapshot published; run generate_dataset.py first")
+    load.items = len(snapshot)
+
+    rng = random.Random(args.seed)
+    for _ in range(args.requests):
+        query = ConferenceQuery.model_validate(random_query(rng, cold=True))
+        with filter_.measure():
+            indices, _ = snapshot.page(query)
+        with project.measure(len(indices)):
+            records = list(snapshot.iter_markers(indices, query.marker_fields()))
+        with serialize.measure(len(records)):
+            app.app.json.dumps(records)
+    return [load, filter_, project, serialize]
+
+
+def api_markers(args):
+    import app
+
+    client = app.app.test_client()
+    rng = random.Random(args.seed)
+    cold, warm, fallback = Stage("markers_cold"), Stage("markers_warm"), Stage("markers_db_fallback")
+
+    queries = [random_query(rng, cold=True) for _ in range(args.requests)]
+    for query in queries:
+        with cold.measure():
+            response = client.post("/api/markers", json=query)
+        assert response.status_code == 200, response.data
+    for query in queries:
+        with warm.measure():
+            client.post("/api/markers", json=query)
+
+    for query in queries[:max(1, args.requests // 10)]:
+        with fallback.measure():
+            app.fetch_markers(app.ConferenceQuery.model_validate(query))
+    return [cold, warm, fallback]
+
+
+class BenchmarkSpider:
+    """
+    Just the attributes PostgreSQLPipeline reads from a spider.
+    """
+    category = "benchmark"
+    subpage = "benchmark"
+
+
+def pipeline_insert(args):
+    import psycopg2
+    from psycopg2 import sql
+
+    import config
+    from scraper_pipelines.pipelines import PostgreSQLPipeline
+
+    pipeline = PostgreSQLPipeline()
+    spider = BenchmarkSpider()
+    process, flush = Stage("process_item"), Stage("flush")
+
+    # Time each flush, including the final one on close
+    original_flush = pipeline.flush
+
+    def timed_flush():
+        count = len(pipeline.buffer)
+        with flush.measure(count):
+            original_flush()
+    pipeline.flush = timed_flush
+
+    pipeline.open_spider(spider)
+    items = [raw_item(conference) for conference in category_conferences("benchmark", args.rows, args.seed)]
+    try:
+        for item in items:
+            with process.measure():
+                pipeline.process_item(item, spider)
+    finally:
+        pipeline.close_spider(spider)
+
+    conn = psycopg2.connect(
+        dbname=config.DB_NAME, user=config.DB_USER, password=config.DB_PASSWORD, host=config.DB_HOST, port=config.DB_PORT
+    )
+    with conn, conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(f"{config.RAW_OUTPUT_TABLE}_benchmark")))
+    conn.close()
+    return [process, flush]
+
+
+def fill_raw_tables(categories, per_category, seed):
+    """
+    Replace the raw tables of the given categories with synthetic rows, as a crawl would leave them.
+    """
+    from psycopg2 import sql
+    from psycopg2.extras import execute_values
+
+    import config
+    from database_update import get_db_connection
+
+    conn, cur = get_db_connection()
+    for category in categories:
+        table = sql.Identifier(f'{config.RAW_OUTPUT_TABLE}_{category.replace(" ", "_")}')
+        columns = sql.SQL(", ").join(map(sql.Identifier, config.RAW_OUTPUT_COLUMNS))
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(table))
+        cur.execute(sql.SQL("CREATE TABLE {} (id SERIAL PRIMARY KEY, {}, page_url TEXT);").format(table, sql.SQL(", ").join(
+            sql.SQL("{} TEXT").format(sql.Identifier(column)) for column in config.RAW_OUTPUT_COLUMNS
+        )))
+        rows = [
+            tuple(raw_item(conference)[column] for column in config.RAW_OUTPUT_COLUMNS)
+            for conference in category_conferences(category, per_category, seed)
+        ]
+        execute_values(cur, sql.SQL("INSERT INTO {} ({}) VALUES %s;").format(table, columns).as_string(cur), rows)
+    conn.commit()
+    conn.close()
+
+
+def stub_geocoding(args):
+    """
+    Lift the geocoder's politeness limit, which exists for the public Nominatim service.
+    """
+    import config
+    config.GEOCODER_RATE_LIMIT = args.geocoder_rate
+    from stub_geocoder import StubGeocoder
+    return StubGeocoder(args.geocoder_latency)
+
+
+def clean(args):
+    from geocoding import BatchGeocoder
+
+    import database_update
+
+    categories = CATEGORIES[:args.categories]
+    database_update.initialize_tables()
+    database_update.create_geolocation_cache()
+    database_update.create_conference_tables()
+    database_update.create_scraped_pages_table()
+    fill_raw_tables(categories, args.conferences_per_category, args.seed)
+    geocoder = stub_geocoding(args)
+
+    read_conn, _ = database_update.get_db_connection()
+    write_conn, _ = database_update.get_db_connection()
+    batch_geocoder = BatchGeocoder(write_conn, geocoder)
+    clean_stage, geocode = Stage("clean_category"), Stage("geocode")
+
+    original_resolve = batch_geocoder.resolve
+
+    def timed_resolve(locations):
+        locations = list(locations)
+        with geocode.measure(len(locations)):
+            return original_resolve(locations)
+    batch_geocoder.resolve = timed_resolve
+
+    try:
+        for category in categories:
+            with clean_stage.measure(args.conferences_per_category):
+                database_update.clean_category(category, read_conn, write_conn, batch_geocoder)
+    finally:
+        read_conn.close()
+        write_conn.close()
+    return [clean_stage, geocode]
+
+
+def refresh(args):
+    import fixture_server
+
+    server = fixture_server.serve(args.fixture_port, args.pages, args.per_page, args.seed, args.page_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        import database_update
+
+        categories = CATEGORIES[:args.categories]
+        database_update.initialize_tables()
+        database_update.create_geolocation_cache()
+        database_update.create_conference_tables()
+        database_update.create_scraped_pages_table()
+        database_update.reset_raw_tables(categories)
+        timings = database_update.refresh_categories(categories, geocoder=stub_geocoding(args))
+    finally:
+        server.shutdown()
+
+    crawl, clean_stage = Stage("crawl"), Stage("clean")
+    for timing in timings.values():
+        crawl.record(timing["crawl_seconds"], args.pages)
+        clean_stage.record(timing["clean_seconds"], args.pages * args.per_page)
+    return [crawl, clean_stage]
+
+
+def run_scenario(name, args):
+    """
+    Run one scenario in this process, returning its results.
+    """
+    use_backend(SCENARIOS[name])
+    if name == "refresh":
+        # Must be set before the scraper's config is imported
+        os.environ.update({
+            "SCRAPER_DOMAIN": "127.0.0.1",
+            "SCRAPER_START_URL": f"http://127.0.0.1:{args.fixture_port}/cfp/call?conference={{}}",
+            "DOWNLOAD_DELAY": "0",
+            "AUTOTHROTTLE_ENABLED": "false",
+        })
+    if args.trace_memory:
+        tracemalloc.start()
+    stages = globals()[name](args)
+    return {
+        "scenario": name,
+        "stages": [stage.summary() for stage in stages],
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_children_mb": peak_rss_mb(children=True),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run benchmark scenarios and write the results as JSON.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run, of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500, help="API requests per stage")
+    parser.add_argument("--rows", type=int, default=10000, help="Raw items written by pipeline_insert")
+    parser.add_argument("--categories", type=int, default=4, help="Categories cleaned/refreshed")
+    parser.add_argument("--conferences-per-category", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=5, help="Fixture listing pages per category")
+    parser.add_argument("--per-page", type=int, default=50, help="Conferences per fixture listing page")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Fixture server latency per page, seconds")
+    parser.add_argument("--fixture-port", type=int, default=8001)
+    parser.add_argument("--geocoder-latency", type=float, default=0.0, help="Stub geocoder latency per lookup, seconds")
+    parser.add_argument("--geocoder-rate", type=float, default=1000.0, help="Geocoder rate limit, lookups per second")
+    parser.add_argument("--trace-memory", action="store_true", help="Record per-stage peak memory with tracemalloc (slower)")
+    parser.add_argument("--allow-default-db", action="store_true", help="Allow running against the default database")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Child mode: run one scenario and write its result to the given file
+        name, path = args.child.split(":", 1)
+        Path(path).write_text(json.dumps(run_scenario(name, args)))
+        sys.exit(0)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if os.getenv("DB_NAME", "conference_mapper") == "conference_mapper" and not args.allow_default_db:
+        raise SystemExit("Benchmarks write to the database; set DB_NAME to a scratch database (or pass --allow-default-db)")
+
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        print(f"Running {name}...")
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+        child_args = [a for a in sys.argv[1:] if a not in SCENARIOS]
+        subprocess.run([sys.executable, __file__, *child_args, "--child", f"{name}:{result_path}"], check=True)
+        result = json.loads(Path(result_path).read_text())
+        os.unlink(result_path)
+        results.append(result)
+        for stage in result["stages"]:
+            print(
+                f"  {stage['stage']:<22}{stage['items_per_sec'] or 0:>14} items/s"
+                f"  p50 {stage['p50_ms']} ms  p99 {stage['p99_ms']} ms  peak {stage['peak_memory_mb']} MB"
+            )
+
+    write_results(args.output, results, {k: v for k, v in vars(args).items() if k not in ("child", "scenarios")})
+    print(f"Results written to {args.output}")
@@ -0,0 +1,77 @@
+"""
+Stand-ins for Nominatim, so benchmarks never hit the public geocoding service.
+
+StubGeocoder can be passed directly to the scraper's BatchGeocoder. For whole-pipeline runs, the
+HTTP server answers Nominatim's /search API; point the scraper at it with
+GEOCODER_DOMAIN=localhost:8002 GEOCODER_SCHEME=http.
+
+    python benchmarks/stub_geocoder.py --port 8002 --latency 0.05
+"""
+import argparse
+import json
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from fixtures import stub_coordinates
+
+Location = namedtuple("Location", ["latitude", "longitude"])
+
+
+class StubGeocoder:
+    """
+    geopy-style geocoder answering from fixtures.stub_coordinates after a fixed latency.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def geocode(self, query):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        coordinates = stub_coordinates(query)
+        return Location(*coordinates) if coordinates else None
+
+
+def make_handler(latency):
+    class NominatimHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                self.send_error(404)
+                return
+            if latency:
+                time.sleep(latency)
+            query = parse_qs(url.query).get("q", [""])[0]
+            coordinates = stub_coordinates(query)
+            places = [{"lat": str(coordinates[0]), "lon": str(coordinates[1]), "display_name": query}] if coordinates else []
+            body = json.dumps(places).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return NominatimHandler
+
+
+def serve(port, latency=0.0):
+    """
+    Start the stub Nominatim server; the caller runs serve_forever (e.g. in a thread) and shuts it down.
+    """
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub Nominatim /search API.")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each answer")
+    args = parser.parse_args()
+    print(f"Stub geocoder listening on http://127.0.0.1:{args.port}/search")
+    serve(args.port, args.latency).serve_forever()
@@ -1,5 +1,8 @@
 BEGIN;
 
+-- Trigram matching, for the API's conference search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS conference_categories (
     id SERIAL PRIMARY KEY,
     category TEXT UNIQUE NOT NULL
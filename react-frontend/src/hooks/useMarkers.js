@@ -2,6 +2,9 @@
 import { useState, useEffect } from "react";
 import { fetchMarkers } from "../services/api";
 
+// Marker fields used by the map and its popups
+const MARKER_FIELDS = ["abbreviation", "name", "dates", "location", "cfp", "lat", "lon"];
+
 const useMarkers = (selectedOptions, startDate, endDate, openCfp) => {
   const [markers, setMarkers] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -14,6 +17,7 @@ const useMarkers = (selectedOptions, startDate, endDate, openCfp) => {
       start_date: startDate,
       end_date: endDate,
       open_cfp: openCfp,
+      fields: MARKER_FIELDS,
     };
 
     fetchMarkers(filters)
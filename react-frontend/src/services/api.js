@@ -12,14 +12,39 @@ export const fetchCategories = async () => {
   }));
 };
 
+// Marker responses we already hold, keyed on the request body. The API answers
+// 304 Not Modified when the ETag we send back is still current.
+const markerCache = new Map();
+const MARKER_CACHE_SIZE = 20;
+
 export const fetchMarkers = async (filters) => {
+  const body = JSON.stringify(filters);
+  const cached = markerCache.get(body);
+  const headers = { 'Content-Type': 'application/json' };
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
+
   const response = await fetch(`${API_BASE_URL}/markers`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(filters),
+    headers,
+    body,
   });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
   if (!response.ok) {
     throw new Error("Error fetching markers");
   }
-  return response.json();
+
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    markerCache.delete(body);
+    markerCache.set(body, { etag, data });
+    if (markerCache.size > MARKER_CACHE_SIZE) {
+      markerCache.delete(markerCache.keys().next().value);
+    }
+  }
+  return data;
 };
\ No newline at end of file
@@ -1,7 +1,7 @@
 import os
 
 # Database parameters
-DB_NAME = "conference_mapper"
+DB_NAME = os.getenv("DB_NAME", "conference_mapper")
 DB_USER = "REDACTED"
 DB_PASSWORD = "REDACTED"
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -10,13 +10,38 @@ DB_PORT = "5432"
 CATEGORIES_TABLE = "conference_categories"
 GEOLOCATION_TABLE = "geolocation_mapping"
 RAW_OUTPUT_TABLE = "scraped_conferences"
-CLEANED_OUTPUT_TABLE = "scraped_conferences_cleaned"
+RAW_OUTPUT_COLUMNS = ["abbreviation", "name", "dates", "location", "cfp"]  # as listed on WikiCFP
+CLEANED_OUTPUT_TABLE = "scraped_conferences_cleaned"  # Legacy per-category tables, migrated into CONFERENCES_TABLE
+CONFERENCES_TABLE = "conferences"
+CONFERENCE_LINKS_TABLE = "conference_category_links"
+DATA_VERSION_TABLE = "data_version"
+MARKER_SNAPSHOT_TABLE = "marker_snapshot"
+SCRAPED_PAGES_TABLE = "scraped_pages"
+RUNS_TABLE = "refresh_runs"
+RUN_CATEGORIES_TABLE = "refresh_run_categories"  # per-category progress of each run
 
 # Scraper parameters
 SCRAPER_NAME = "wikicfp_scraper"
-SCRAPER_DOMAIN = "wikicfp.com"
-START_URL = "http://www.wikicfp.com/cfp/call?conference={}"
+# Both can be pointed at a local fixture server, e.g. for benchmarking
+SCRAPER_DOMAIN = os.getenv("SCRAPER_DOMAIN", "wikicfp.com")
+START_URL = os.getenv("SCRAPER_START_URL", "http://www.wikicfp.com/cfp/call?conference={}")
 PAGE_COUNT_MAXIMUM = 20
+INCREMENTAL_SCRAPING = True  # skip unchanged pages and stop early on known conferences; see --full-refresh
+
+# Crawl concurrency. Each category is crawled by its own spider, all sharing one reactor; since each
+# crawler has its own downloader, the load on WikiCFP is roughly
+# CRAWL_CONCURRENT_CATEGORIES x CONCURRENT_REQUESTS_PER_DOMAIN requests in flight.
+CRAWL_CONCURRENT_CATEGORIES = 4
+CONCURRENT_REQUESTS_PER_DOMAIN = 2
+DOWNLOAD_DELAY = float(os.getenv("DOWNLOAD_DELAY", 0.5))  # seconds, before AutoThrottle adjustments
+AUTOTHROTTLE_ENABLED = os.getenv("AUTOTHROTTLE_ENABLED", "true").lower() == "true"
+AUTOTHROTTLE_START_DELAY = 1.0
+AUTOTHROTTLE_MAX_DELAY = 30.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
+
+# Raw item pipeline parameters
+PIPELINE_FLUSH_SIZE = 500  # buffered rows written per COPY
+PIPELINE_FLUSH_INTERVAL = 5.0  # seconds; buffers older than this are flushed on the next item
 
 # Scraper categories from WikiCFP
 CATEGORIES = [
@@ -45,3 +70,32 @@ CATEGORIES = [
     'social networks',
     'social media',
 ]
+
+# Crawled categories allowed to wait for (or be in) cleaning, counting those still being crawled.
+# Crawling pauses when this many categories are ahead of the cleaning stage.
+REFRESH_MAX_PENDING_CATEGORIES = 8
+
+# Machine-readable summary of each run's per-category timings and counters
+RUN_SUMMARY_PATH = os.getenv("RUN_SUMMARY_PATH", "run_summary.json")
+
+# Cleaning parameters
+CLEAN_FETCH_SIZE = 1000  # raw rows fetched per round trip from the server-side cursor
+CLEAN_BATCH_SIZE = 200  # conferences geocoded and committed together
+# Processes parsing raw rows; parsing is cheap next to geocoding, so 1 (in-process) is usually enough
+CLEAN_PARSE_WORKERS = int(os.getenv("CLEAN_PARSE_WORKERS", 1))
+
+# Geocoder parameters
+GEOCODER_USER_AGENT = "geocoding_app"
+GEOCODER_DOMAIN = os.getenv("GEOCODER_DOMAIN", "nominatim.openstreetmap.org")
+GEOCODER_SCHEME = os.getenv("GEOCODER_SCHEME", "https")
+GEOCODER_TIMEOUT = 10
+GEOCODER_WORKERS = 4
+GEOCODER_RATE_LIMIT = 1.0  # requests per second across all workers, per Nominatim's usage policy
+GEOCODER_RETRIES = 3
+GEOCODER_BACKOFF = 2.0  # seconds, doubled after each failed attempt
+GEOCODER_NEGATIVE_TTL_DAYS = 30  # how long to remember that a location couldn't be found
+
+# Offline gazetteer, consulted before the cache and the geocoder. GAZETTEER_PATH is a directory holding
+# countries.tsv, admin1.tsv and cities.tsv; unset, the bundled data/ directory is used
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() == "true"
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH")
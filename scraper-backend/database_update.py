@@ -1,17 +1,30 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import Queue, Semaphore
 from time import sleep
 
-from geopy.geocoders import Nominatim
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 import config
-from scraper import run_spider, WikiCFPSpider
+from geocoding import BatchGeocoder, normalize_location
+from parsing import conference_identity, listing_key, parse_cfp_deadline, parse_conference
+from run_state import CLEANED, CRAWLED, RunState, abort_run, create_run_tables, print_run_status
+from scraper import start_spiders, WikiCFPSpider
 
+# Value of a listing key in clean_category's processed dict when the geocoder failed on its location
+GEOCODING_FAILED = "geocoding failed"
 
-# Persist geolocator to avoid reloading
-geolocator = Nominatim(user_agent="geocoding_app")
+# Geocoding counters reported per category, as read from BatchGeocoder.stats()
+GEOCODING_COUNTERS = [
+    "offline", "cache_hits", "negative_cache_hits", "geocoded", "not_found", "failed", "remote", "lookups", "lookup_seconds"
+]
 
 
 def get_db_connection(retries=30, delay=2):
@@ -62,18 +75,18 @@ def initialize_tables():
     cur.close()
     conn.close()
 
-def truncate_raw_tables(categories):
+def reset_raw_tables(categories):
+    """
+    Drop the categories' raw tables, left over from the previous run. The scraping pipeline recreates
+    them, in the current layout, as each category's crawl starts.
+    """
     conn, cur = get_db_connection()
     for category in categories:
         table_name = f'{config.RAW_OUTPUT_TABLE}_{category.replace(" ", "_")}'
-        query = sql.SQL("TRUNCATE TABLE {} RESTART IDENTITY CASCADE;").format(sql.Identifier(table_name))
-        try:
-            cur.execute(query)
-            print(f"Table {table_name} truncated successfully.")
-        except Exception as e:
-            print(f"Error truncating table {table_name}: {e}")
-            continue
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(table_name)))
+        print(f"Table {table_name} reset.")
     conn.commit()
+    conn.close()
 
 def fetch_categories():
     """
@@ -84,260 +97,857 @@ def fetch_categories():
     cur.execute(f"SELECT * FROM {config.CATEGORIES_TABLE};")
     return cur.fetchall()
 
-def scrape_categories(categories):
+def create_scraped_pages_table():
     """
-    Iterate through the listed categories, use a Scrapy spider and pipeline to
-    store collected data in postgres.
+    Create the table recording each crawled listing page's content hash and HTTP validators,
+    used by incremental runs to skip pages that haven't changed.
 
-    Raw data is stored in tables as {data: <string>}, with table names following a convention
-    of "scraped_conferences_<category-name>".
-    """
-    for category in categories:
-        print(f"Scraping {category}...")
-        run_spider(WikiCFPSpider, subpage=category)
-
-def create_geolocation_cache():
-    """
-    Create geo table if it doesn't already exist.
-    Add an index for O(1) lookups based on input location name.
+    A page only counts as unchanged once its rows are cleaned: cleaned is set when its category's
+    clean commits, unless retry was set because some of its rows were dropped after the geocoder
+    failed on their location (e.g. timed out), so the page is parsed again by the next run. Rows
+    dropped for good, such as those with a location cached as not found, don't set it.
     """
     conn, cur = get_db_connection()
     cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS {config.GEOLOCATION_TABLE} (
-            location VARCHAR(255) PRIMARY KEY,
-            lat DOUBLE PRECISION,
-            lon DOUBLE PRECISION
+        CREATE TABLE IF NOT EXISTS {config.SCRAPED_PAGES_TABLE} (
+            category TEXT NOT NULL,
+            url TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            next_url TEXT,
+            fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            cleaned BOOLEAN NOT NULL DEFAULT FALSE,
+            retry BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (category, url)
         );
     """)
     cur.execute(f"""
-        CREATE INDEX IF NOT EXISTS idx_city_btree ON {config.GEOLOCATION_TABLE} (location);
+        ALTER TABLE {config.SCRAPED_PAGES_TABLE} ADD COLUMN IF NOT EXISTS cleaned BOOLEAN NOT NULL DEFAULT FALSE;
+        ALTER TABLE {config.SCRAPED_PAGES_TABLE} ADD COLUMN IF NOT EXISTS retry BOOLEAN NOT NULL DEFAULT FALSE;
     """)
     conn.commit()
+    conn.close()
 
-def geo_lookup(location_name):
+def create_refresh_run_tables():
     """
-    If the location has been seen before, retrieve from the cache.
-    Otherwise, query the geolocator for lat/long.
+    Create the tables recording refresh runs and their per-category progress; see run_state.
     """
     conn, cur = get_db_connection()
-    location_name = location_name.strip().lower()
+    create_run_tables(cur)
+    conn.commit()
+    conn.close()
 
-    # Look up in location cache
-    cur.execute(f"""
-        SELECT * FROM {config.GEOLOCATION_TABLE} WHERE location = %s;
-    """, (location_name,))
-    result = cur.fetchone()
-    if result:
-        return result[1], result[2]
-
-    # Handle some edge cases
-    if location_name in {"virtual conference", "", "n/a", "hybrid", "online", "publication"}:
-        return None
+def create_geolocation_cache():
+    """
+    Create geo table if it doesn't already exist.
+    Add an index for O(1) lookups based on input location name.
 
-    # If not in location cache, retrieve location and add it to the cache
-    location = geolocator.geocode(location_name)
-    if not location:
-        return None
+    Locations the geocoder couldn't find are cached too, with NULL coordinates and a
+    retry_after timestamp before which they aren't looked up again.
 
-    # Store and return values
+    Entries cached under an older normalization are re-keyed to normalize_location, keeping the
+    existing entry where two old keys now share one.
+    """
+    conn, cur = get_db_connection()
     cur.execute(f"""
-        INSERT INTO {config.GEOLOCATION_TABLE} (location, lat, lon) 
-        VALUES (%s, %s, %s);
-    """, (location_name, location.latitude, location.longitude))
+        CREATE TABLE IF NOT EXISTS {config.GEOLOCATION_TABLE} (
+            location TEXT PRIMARY KEY,
+            lat DOUBLE PRECISION,
+            lon DOUBLE PRECISION,
+            retry_after TIMESTAMP
+        );
+    """)
+    cur.execute(f"""
+        ALTER TABLE {config.GEOLOCATION_TABLE} ALTER COLUMN location TYPE TEXT;
+        ALTER TABLE {config.GEOLOCATION_TABLE} ADD COLUMN IF NOT EXISTS retry_after TIMESTAMP;
+    """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_city_btree ON {config.GEOLOCATION_TABLE} (location);
+    """)
+    cur.execute(f"SELECT location FROM {config.GEOLOCATION_TABLE};")
+    renamed = [
+        (location, normalize_location(location)) for (location,) in cur.fetchall()
+        if location != normalize_location(location)
+    ]
+    if renamed:
+        execute_values(cur, f"""
+            INSERT INTO {config.GEOLOCATION_TABLE} (location, lat, lon, retry_after)
+            SELECT v.new_key, g.lat, g.lon, g.retry_after
+            FROM (VALUES %s) AS v (old_key, new_key)
+            JOIN {config.GEOLOCATION_TABLE} g ON g.location = v.old_key
+            ORDER BY g.lat IS NULL
+            ON CONFLICT (location) DO NOTHING;
+        """, renamed)
+        cur.execute(f"DELETE FROM {config.GEOLOCATION_TABLE} WHERE location = ANY(%s);", ([old for old, _ in renamed],))
+        print(f"Re-keyed {len(renamed)} cached locations")
     conn.commit()
-    return location.latitude, location.longitude
 
-def store_cleaned_conferences(conferences, category):
+def create_conference_tables():
     """
-    Create a table for cleaned data by category, if not exists.
-    Table naming convention, "scraped_conferences_cleaned_<category-name>".
+    Create the unified conferences table and the link table mapping conferences to categories,
+    if they don't already exist. Each conference is stored once, under its identity key, regardless
+    of how many categories list it; B-tree indexes back the API's date and CFP filters.
+    Also enables pg_trgm, whose indexes on the snapshot tables back the API's search.
     """
     conn, cur = get_db_connection()
-    table_name = f'{config.CLEANED_OUTPUT_TABLE}_{category.replace(" ", "_")}'
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
     cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS {table_name} (
+        CREATE TABLE IF NOT EXISTS {config.CONFERENCES_TABLE} (
             id SERIAL PRIMARY KEY,
+            identity_key TEXT,
             abbreviation TEXT,
-            name TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
             dates TEXT,
             start_date TIMESTAMP,
             end_date TIMESTAMP,
             location TEXT,
-            cfp TEXT, 
+            cfp TEXT,
+            cfp_deadline TIMESTAMP,
+            cfp_parse_status TEXT,
             lat DOUBLE PRECISION,
             lon DOUBLE PRECISION
         );
     """)
-    conn.commit()
+    cur.execute(f"""
+        ALTER TABLE {config.CONFERENCES_TABLE} ADD COLUMN IF NOT EXISTS cfp_parse_status TEXT;
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.CONFERENCE_LINKS_TABLE} (
+            conference_id INTEGER NOT NULL REFERENCES {config.CONFERENCES_TABLE} (id) ON DELETE CASCADE,
+            category_id INTEGER NOT NULL REFERENCES {config.CATEGORIES_TABLE} (id) ON DELETE CASCADE,
+            PRIMARY KEY (category_id, conference_id)
+        );
+    """)
 
-    # Add to database using insert_many for efficiency
-    insert_query = sql.SQL(f"""
-        INSERT INTO {table_name} 
-        (abbreviation, name, dates, start_date, end_date, location, cfp, lat, lon)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (name) DO NOTHING;
+    # Conferences used to be unique by name alone; key existing rows by identity before enforcing it
+    cur.execute(f"""
+        ALTER TABLE {config.CONFERENCES_TABLE} ADD COLUMN IF NOT EXISTS identity_key TEXT;
+        ALTER TABLE {config.CONFERENCES_TABLE} DROP CONSTRAINT IF EXISTS {config.CONFERENCES_TABLE}_name_key;
     """)
-    data_tuples = [
-        (
-            conf["abbreviation"], conf["name"], conf["dates"], conf["start_date"],
-            conf["end_date"], conf["location"], conf["cfp"],
-            conf["lat"], conf["long"]
-        )
-        for conf in conferences
-    ]
-    if data_tuples:
-        cur.executemany(insert_query, data_tuples)
+    assign_identity_keys(cur)
+    cur.execute(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_conferences_identity_key ON {config.CONFERENCES_TABLE} (identity_key);
+    """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_conferences_start_date ON {config.CONFERENCES_TABLE} (start_date);
+        CREATE INDEX IF NOT EXISTS idx_conferences_end_date ON {config.CONFERENCES_TABLE} (end_date);
+        CREATE INDEX IF NOT EXISTS idx_conferences_cfp_deadline ON {config.CONFERENCES_TABLE} (cfp_deadline);
+        CREATE INDEX IF NOT EXISTS idx_conferences_location ON {config.CONFERENCES_TABLE} USING GIST (point(lon, lat));
+        CREATE INDEX IF NOT EXISTS idx_conference_links_conference ON {config.CONFERENCE_LINKS_TABLE} (conference_id);
+    """)
+
+    # Single-row version stamp, bumped at the end of every update so the API knows to drop cached responses
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.DATA_VERSION_TABLE} (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+    """)
+    cur.execute(f"""
+        INSERT INTO {config.DATA_VERSION_TABLE} (version) VALUES (1) ON CONFLICT (id) DO NOTHING;
+    """)
+
+    create_snapshot_view(cur)
     conn.commit()
+    conn.close()
 
-def clean_categories(categories):
+def build_snapshot_table(cur, table):
     """
-    Clean and store conference data, filtering out entries with incomplete information.
-    Only conferences with valid location (with geo coordinates) and complete date information
-    will be stored in the cleaned tables.
+    Bulk-load a read-optimized snapshot table for the API: one row per conference with its
+    category ids. The primary key, and the trigram indexes on lowercased names and abbreviations
+    backing /api/search, are only added once the rows are in.
     """
-    conn, cur = get_db_connection()
-    for category in categories:
-        print(f"\nProcessing {category}...")
-        # Retrieve raw data
-        table_name = f'{config.RAW_OUTPUT_TABLE}_{category.replace(" ", "_")}'
-        cur.execute(sql.SQL("SELECT * FROM {};").format(sql.Identifier(table_name)))
-        data = cur.fetchall()
-
-        # Statistics tracking
-        total_conferences = 0
-        filtered_no_location = 0
-        filtered_no_dates = 0
-        accepted_conferences = 0
-
-        # Iterate through raw data in pairs of lines
-        conferences = []
-        i = 0
-        while i < len(data):
-            entry = data[i][1].split("||||")
-            if len(entry) <= 1:  # WikiCFP table break after which deadlines for cfp are past
-                i += 1
-                continue
-                
-            try:
-                entry2 = data[i+1][1].split("||||")
-            except Exception as e:
-                print(f"Error processing entry at index {i}: {e}")
-                break
-
-            total_conferences += 1
-
-            # Initialize conference data
-            conference_data = {
-                "abbreviation": entry[0],
-                "name": entry[1],
-                "dates": entry2[0],
-                "location": entry2[1],
-                "cfp": entry2[2],
-                "start_date": None,
-                "end_date": None,
-                "lat": None,
-                "long": None
-            }
+    cur.execute(f"DROP TABLE IF EXISTS {table};")
+    cur.execute(f"""
+        CREATE TABLE {table} AS
+        SELECT c.id, c.abbreviation, c.name, c.dates, c.start_date, c.end_date, c.location,
+               c.cfp, c.cfp_deadline, c.cfp_parse_status, c.lat, c.lon,
+               ARRAY_AGG(l.category_id ORDER BY l.category_id) AS category_ids
+        FROM {config.CONFERENCES_TABLE} c
+        JOIN {config.CONFERENCE_LINKS_TABLE} l ON l.conference_id = c.id
+        GROUP BY c.id;
+    """)
+    cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id);")
+    cur.execute(f"CREATE INDEX {table}_name_trgm ON {table} USING GIN (lower(name) gin_trgm_ops);")
+    cur.execute(f"CREATE INDEX {table}_abbreviation_trgm ON {table} USING GIN (lower(abbreviation) gin_trgm_ops);")
+    cur.execute(f"ANALYZE {table};")
 
-            # Geo lookup - skip if no valid coordinates
-            try:
-                coordinates = geo_lookup(entry2[1])
-                if not coordinates:
-                    print(f"Skipping conference '{entry[1]}': No valid coordinates for location '{entry2[1]}'")
-                    filtered_no_location += 1
-                    i += 2
-                    continue
-                conference_data["lat"], conference_data["long"] = coordinates
-            except Exception as e:
-                print(f"Skipping conference '{entry[1]}': Geo lookup failed for '{entry2[1]}': {e}")
-                filtered_no_location += 1
-                i += 2
-                continue
+def create_snapshot_view(cur):
+    """
+    Create the marker_snapshot view the API reads, over a snapshot table for the current data
+    version, if it doesn't exist yet. Replaces the materialized view older deployments used.
+    """
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (config.MARKER_SNAPSHOT_TABLE,))
+    row = cur.fetchone()
+    if row and row[0] == "v":
+        return
+    if row and row[0] == "m":
+        cur.execute(f"DROP MATERIALIZED VIEW {config.MARKER_SNAPSHOT_TABLE};")
+    cur.execute(f"SELECT version FROM {config.DATA_VERSION_TABLE};")
+    table = f"{config.MARKER_SNAPSHOT_TABLE}_v{cur.fetchone()[0]}"
+    build_snapshot_table(cur, table)
+    cur.execute(f"CREATE VIEW {config.MARKER_SNAPSHOT_TABLE} AS SELECT * FROM {table};")
+
+def publish_snapshot():
+    """
+    Publish the stored conferences to the API as a blue/green swap. The next version's snapshot
+    table is built alongside the live one, then the marker_snapshot view is pointed at it and the
+    data version bumped in one short transaction. Readers (i.e. the API's snapshot store and response
+    cache) compare this stamp against the version their data was built from, and read it together
+    with the snapshot, so they always see a matching pair, and never wait on the build.
 
-            # Date parsing - skip if invalid dates
-            try:
-                start_str, end_str = entry2[0].split(" - ")
-                conference_data["start_date"] = datetime.strptime(start_str, "%b %d, %Y")
-                conference_data["end_date"] = datetime.strptime(end_str, "%b %d, %Y")
-            except Exception as e:
-                print(f"Skipping conference '{entry[1]}': Invalid date format '{entry2[0]}': {e}")
-                filtered_no_dates += 1
-                i += 2
-                continue
+    If the build fails, the previously published snapshot stays in place.
+    """
+    conn, cur = get_db_connection()
+    start = time.monotonic()
+    cur.execute(f"SELECT version FROM {config.DATA_VERSION_TABLE};")
+    previous = cur.fetchone()[0]
+    table = f"{config.MARKER_SNAPSHOT_TABLE}_v{previous + 1}"
+    build_snapshot_table(cur, table)
+    cur.execute(f"SELECT COUNT(*) FROM {table};")
+    count = cur.fetchone()[0]
+    conn.commit()
+    built = time.monotonic()
 
-            # Check submission date - just validate the format
-            try:
-                cfp_date = datetime.strptime(entry2[2], "%b %d, %Y")
-            except Exception as e:
-                print(f"Note: CFP date parsing failed for '{entry[1]}': {entry2[2]}: {e}")
-
-            # If we got here, the conference has all required data
-            conferences.append(conference_data)
-            accepted_conferences += 1
-            i += 2
-
-        # Store the cleaned conferences
-        if conferences:
-            print(f"\nCategory {category} statistics:")
-            print(f"Total conferences processed: {total_conferences}")
-            print(f"Filtered due to missing location: {filtered_no_location}")
-            print(f"Filtered due to invalid dates: {filtered_no_dates}")
-            print(f"Accepted conferences: {accepted_conferences}")
-            print(f"Storing {len(conferences)} cleaned conferences...")
-            store_cleaned_conferences(conferences, category)
-        else:
-            print(f"\nNo valid conferences found for {category}")
+    cur.execute(f"""
+        UPDATE {config.DATA_VERSION_TABLE} SET version = %s, updated_at = NOW() WHERE version = %s;
+    """, (previous + 1, previous))
+    if cur.rowcount == 0:
+        conn.rollback()
+        cur.execute(f"DROP TABLE {table};")
+        conn.commit()
+        conn.close()
+        raise RuntimeError("The data version changed while the snapshot was being built; not publishing")
+    cur.execute(f"CREATE OR REPLACE VIEW {config.MARKER_SNAPSHOT_TABLE} AS SELECT * FROM {table};")
+    conn.commit()
+    swapped = time.monotonic()
 
+    # Drop the superseded snapshot tables, once the API has finished any load still reading them
+    cur.execute("""
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = current_schema() AND tablename LIKE %s AND tablename <> %s;
+    """, (f"{config.MARKER_SNAPSHOT_TABLE}\\_v%", table))
+    for (old_table,) in cur.fetchall():
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(old_table)))
+    conn.commit()
     conn.close()
 
-def drop_duplicates(categories, column="name"):
+    seconds = time.monotonic() - start
+    print(
+        f"Published snapshot of {count} conferences as data version {previous + 1} in {seconds:.3f}s "
+        f"(swap {swapped - built:.3f}s)."
+    )
+    return {
+        "data_version": previous + 1,
+        "conferences": count,
+        "publish_seconds": round(seconds, 3),
+        "swap_seconds": round(swapped - built, 3),
+    }
+
+def migrate_category_tables(categories):
     """
-    Iterate over all tables in the database. Remove rows with duplicate "name" entries.
+    One-off migration from the legacy layout of one "scraped_conferences_cleaned_<category-name>"
+    table per category. Rows are backfilled into the unified conferences table along with their
+    category links, after which the legacy table is dropped. Categories without a legacy table
+    are skipped, so this is safe to run on every update.
     """
     conn, cur = get_db_connection()
     for category in categories:
-        print(f"Dropping duplicate entries from {category}...")
-        table = f'{config.CLEANED_OUTPUT_TABLE}_{category.replace(" ", "_")}'
-        query = f"""
-            WITH cte AS (
-                SELECT 
-                    ctid, 
-                    ROW_NUMBER() OVER (PARTITION BY {column} ORDER BY ctid) AS rnk
-                FROM {table}
-            )
-            DELETE FROM {table}
-            WHERE ctid IN (
-                SELECT ctid FROM cte WHERE rnk > 1
-            );
-            """
+        table_name = f'{config.CLEANED_OUTPUT_TABLE}_{category.replace(" ", "_")}'
+        cur.execute("SELECT to_regclass(%s);", (table_name,))
+        if cur.fetchone()[0] is None:
+            continue
+
+        print(f"Migrating {table_name} into {config.CONFERENCES_TABLE}...")
         try:
-            cur.execute(query)
+            with conn.cursor(cursor_factory=RealDictCursor) as legacy_cur:
+                legacy_cur.execute(sql.SQL("""
+                    SELECT abbreviation, name, dates, start_date, end_date, location, cfp, lat, lon FROM {};
+                """).format(sql.Identifier(table_name)))
+                conferences = []
+                for row in legacy_cur.fetchall():
+                    conference = dict(row, long=row["lon"])
+                    conference["cfp_deadline"], conference["cfp_parse_status"] = parse_cfp_deadline(row["cfp"])
+                    conference["identity_key"] = conference_identity(row["name"], row["abbreviation"], row["start_date"])
+                    conferences.append(conference)
+            store_cleaned_conferences(conferences, category, conn)
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(table_name)))
             conn.commit()
         except psycopg2.Error as e:
-            print(f"Error executing query for {table}: {e}")
+            conn.rollback()
+            print(f"Error migrating table {table_name}: {e}")
             continue
+    conn.close()
 
+def assign_identity_keys(cur):
+    """
+    Compute identity keys for rows stored without one. Rows that turn out to share a key are merged
+    into the oldest of them, which takes over their category links.
+    """
+    cur.execute(f"""
+        SELECT id, identity_key, name, abbreviation, start_date FROM {config.CONFERENCES_TABLE} ORDER BY id;
+    """)
+    rows = cur.fetchall()
+    if all(identity_key for _, identity_key, _, _, _ in rows):
+        return
+
+    groups = {}
+    for conference_id, identity_key, name, abbreviation, start_date in rows:
+        key = identity_key or conference_identity(name, abbreviation, start_date)
+        groups.setdefault(key, []).append((conference_id, identity_key))
+
+    print("Assigning identity keys to stored conferences...")
+    updates = []
+    for key, members in groups.items():
+        (keep, keep_key), duplicates = members[0], [conference_id for conference_id, _ in members[1:]]
+        if duplicates:
+            cur.execute(f"""
+                INSERT INTO {config.CONFERENCE_LINKS_TABLE} (conference_id, category_id)
+                SELECT %s, category_id FROM {config.CONFERENCE_LINKS_TABLE} WHERE conference_id = ANY(%s)
+                ON CONFLICT DO NOTHING;
+            """, (keep, duplicates))
+            cur.execute(f"DELETE FROM {config.CONFERENCES_TABLE} WHERE id = ANY(%s);", (duplicates,))
+        if keep_key is None:
+            updates.append((key, keep))
+    cur.executemany(f"UPDATE {config.CONFERENCES_TABLE} SET identity_key = %s WHERE id = %s;", updates)
+
+def backfill_cfp_deadlines():
+    """
+    Parse CFP deadlines for rows stored before deadlines were parsed at ingest,
+    i.e. rows without a recorded parse status.
+    """
+    conn, cur = get_db_connection()
+    cur.execute(f"""
+        SELECT id, cfp FROM {config.CONFERENCES_TABLE} WHERE cfp_parse_status IS NULL;
+    """)
+    updates = [(*parse_cfp_deadline(cfp), conference_id) for conference_id, cfp in cur.fetchall()]
+    if updates:
+        print(f"Backfilling CFP deadlines for {len(updates)} conferences...")
+        cur.executemany(f"""
+            UPDATE {config.CONFERENCES_TABLE} SET cfp_deadline = %s, cfp_parse_status = %s WHERE id = %s;
+        """, updates)
+    conn.commit()
+    conn.close()
 
+def store_cleaned_conferences(conferences, category, conn, checkpoint=None):
+    """
+    Upsert cleaned conferences into the unified conferences table by identity key and link them to
+    the category, committing them as one batch. A conference already stored (e.g. from another
+    category or an earlier run) is updated in place, and only written if its listing changed.
 
-if __name__ == "__main__":
-    # Initialize database if necessary
-    initialize_tables()
-    create_geolocation_cache()
+    checkpoint, if given, is called with the cursor before committing, to record progress in the
+    same transaction.
+    """
+    cur = conn.cursor()
+
+    # One row per identity: an upsert can't touch the same row twice in one statement
+    data_tuples = {}
+    for conf in conferences:
+        data_tuples.setdefault(conf["identity_key"], (
+            conf["identity_key"], conf["abbreviation"], conf["name"], conf["dates"], conf["start_date"],
+            conf["end_date"], conf["location"], conf["cfp"], conf["cfp_deadline"],
+            conf["cfp_parse_status"], conf["lat"], conf["long"]
+        ))
+    if data_tuples:
+        execute_values(cur, f"""
+            INSERT INTO {config.CONFERENCES_TABLE} AS c
+            (identity_key, abbreviation, name, dates, start_date, end_date, location, cfp, cfp_deadline,
+             cfp_parse_status, lat, lon)
+            VALUES %s
+            ON CONFLICT (identity_key) DO UPDATE SET
+                abbreviation = EXCLUDED.abbreviation, name = EXCLUDED.name, dates = EXCLUDED.dates,
+                start_date = EXCLUDED.start_date, end_date = EXCLUDED.end_date, location = EXCLUDED.location,
+                cfp = EXCLUDED.cfp, cfp_deadline = EXCLUDED.cfp_deadline,
+                cfp_parse_status = EXCLUDED.cfp_parse_status, lat = EXCLUDED.lat, lon = EXCLUDED.lon
+            WHERE (c.abbreviation, c.name, c.dates, c.start_date, c.end_date, c.location, c.cfp, c.cfp_deadline,
+                   c.cfp_parse_status, c.lat, c.lon)
+                IS DISTINCT FROM
+                  (EXCLUDED.abbreviation, EXCLUDED.name, EXCLUDED.dates, EXCLUDED.start_date, EXCLUDED.end_date,
+                   EXCLUDED.location, EXCLUDED.cfp, EXCLUDED.cfp_deadline, EXCLUDED.cfp_parse_status,
+                   EXCLUDED.lat, EXCLUDED.lon);
+        """, list(data_tuples.values()), page_size=len(data_tuples))
+        link_conferences(list(data_tuples), category, cur)
+    if checkpoint:
+        checkpoint(cur)
+    conn.commit()
+    cur.close()
 
-    # Retrieve categories
-    categories = [x[1] for x in fetch_categories()]
+def link_conferences(identity_keys, category, cur):
+    """
+    Link the stored conferences with the given identity keys to a category, in one statement.
+    """
+    cur.execute(f"""
+        INSERT INTO {config.CONFERENCE_LINKS_TABLE} (conference_id, category_id)
+        SELECT c.id, cc.id
+        FROM {config.CONFERENCES_TABLE} c, {config.CATEGORIES_TABLE} cc
+        WHERE c.identity_key = ANY(%s) AND cc.category = %s
+        ON CONFLICT DO NOTHING;
+    """, (identity_keys, category))
+
+def mark_retry_pages(urls, category, cur):
+    """
+    Flag listing pages with rows that couldn't be stored, so the next run parses them again.
+    """
+    cur.execute(f"""
+        UPDATE {config.SCRAPED_PAGES_TABLE} SET retry = TRUE WHERE category = %s AND url = ANY(%s);
+    """, (category, [url for url in urls if url]))
 
-    # Drop duplicates - probably unnecessary, but running this preemptively in case
-    # any one of the scraping or cleaning operations is interrupted (so that DB doesn't fill up
-    # with duplicate entries)
-    drop_duplicates(categories)
-    truncate_raw_tables(categories)
+def mark_pages_cleaned(category, cur):
+    """
+    Mark the category's pages crawled since it was last cleaned as cleaned, except those to retry.
+    """
+    cur.execute(f"""
+        UPDATE {config.SCRAPED_PAGES_TABLE} SET cleaned = NOT retry WHERE category = %s AND NOT cleaned;
+    """, (category,))
 
-    # Scrape new data
-    scrape_categories(categories)
+def read_raw_rows(conn, table_name, after_id=0):
+    """
+    Stream the id, listing page and listed fields (see RAW_OUTPUT_COLUMNS) of each conference in a raw
+    table after after_id, through a named, server-side cursor, so only CLEAN_FETCH_SIZE rows are held
+    in memory at a time.
+    """
+    with conn.cursor(name="raw_rows") as cur:
+        cur.itersize = config.CLEAN_FETCH_SIZE
+        cur.execute(sql.SQL("SELECT id, page_url, {} FROM {} WHERE id > %s ORDER BY id;").format(
+            sql.SQL(", ").join(map(sql.Identifier, config.RAW_OUTPUT_COLUMNS)), sql.Identifier(table_name)
+        ), (after_id,))
+        yield from cur
+
+def unprocessed_rows(rows, processed, shared, stats, retry_pages):
+    """
+    Filter out raw rows listing a conference already processed during this run, e.g. for another
+    category, collecting the identity keys of those that were stored into shared, and the pages of
+    those the geocoder failed on into retry_pages.
+
+    processed maps the listing key of every conference seen so far to its identity key once it's
+    stored, GEOCODING_FAILED if the geocoder failed on its location, or None if it's still in
+    progress or was filtered out.
+    """
+    for row in rows:
+        stats["total"] += 1
+        key = listing_key(row[2:])
+        if key in processed:
+            stats["shared"] += 1
+            if processed[key] == GEOCODING_FAILED:
+                retry_pages.add(row[1])
+            elif processed[key]:
+                shared.append(processed[key])
+            continue
+        processed[key] = None
+        yield row
 
-    # Clean data
-    clean_categories(categories)
+def parse_conferences(rows, stats, executor=None):
+    """
+    Parse a batch of raw rows, as read by read_raw_rows, into conference dicts, updating
+    the stats counters in place. Conferences without valid dates are dropped here.
 
-    # Drop duplicates
-    drop_duplicates(categories)
+    With an executor (a process pool), the batch is parsed in parallel.
+    """
+    listings = [row[2:] for row in rows]
+    if executor:
+        results = executor.map(parse_conference, listings, chunksize=max(1, len(listings) // config.CLEAN_PARSE_WORKERS))
+    else:
+        results = map(parse_conference, listings)
+    conferences = []
+    for row, (conference_data, error) in zip(rows, results):
+        if conference_data is None:
+            print(f"Skipping conference '{row[3]}': {error}")
+            stats["no_dates"] += 1
+            continue
+        if conference_data["cfp_parse_status"] == "invalid":
+            print(f"Note: CFP date parsing failed for '{row[3]}': {row[6]}")
+            stats["unparsed_cfp"] += 1
+        conference_data["page_url"] = row[1]
+        conferences.append(conference_data)
+    return conferences
+
+def create_parse_executor():
+    """
+    Process pool for parsing raw rows, or None if CLEAN_PARSE_WORKERS is 1 or less. Workers are
+    spawned rather than forked, so they never inherit the parent's database connections.
+    """
+    if config.CLEAN_PARSE_WORKERS <= 1:
+        return None
+    return ProcessPoolExecutor(config.CLEAN_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most size items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def geocode_conferences(conferences, batch_geocoder, stats):
+    """
+    Attach coordinates to a batch of conferences, dropping those without valid coordinates.
+    """
+    coordinates = batch_geocoder.resolve(conf["location"] for conf in conferences)
+    located = []
+    for conference_data in conferences:
+        location = coordinates.get(normalize_location(conference_data["location"]))
+        if not location:
+            print(f"Skipping conference '{conference_data['name']}': No valid coordinates for location '{conference_data['location']}'")
+            stats["no_location"] += 1
+            continue
+        conference_data["lat"], conference_data["long"] = location
+        located.append(conference_data)
+        stats["accepted"] += 1
+    return located
+
+def clean_category(category, read_conn, write_conn, batch_geocoder, processed=None, executor=None,
+                   progress=None, checkpoint=None):
+    """
+    Clean and store one category's raw data, returning its statistics, or None if it failed.
+
+    The category streams through a pipeline: raw rows are read from a server-side cursor, then
+    parsed, geocoded and written in batches of CLEAN_BATCH_SIZE rows. Memory stays flat regardless
+    of raw table size, and each batch is committed on its own, so an interrupted run only loses the
+    batch in progress.
+
+    Pass the same processed dict (see unprocessed_rows) for every category of a run: a conference
+    listed by several categories is then parsed, geocoded and written once, and only linked to the
+    other categories.
+
+    To resume an interrupted clean, pass the progress checkpointed so far, as
+    (last raw id handled, stats); checkpoint(cur, last_raw_id, stats), if given, is called in
+    each batch's transaction to record it.
+    """
+    print(f"\nProcessing {category}...")
+    table_name = f'{config.RAW_OUTPUT_TABLE}_{category.replace(" ", "_")}'
+    processed = {} if processed is None else processed
+    after_id, stats = progress or (0, None)
+
+    # Statistics tracking
+    stats = dict(stats or {"total": 0, "shared": 0, "no_location": 0, "no_dates": 0, "unparsed_cfp": 0, "accepted": 0})
+    if after_id:
+        print(f"Resuming after raw row {after_id}")
+
+    shared = []
+    retry_pages = set()
+    rows = unprocessed_rows(read_raw_rows(read_conn, table_name, after_id), processed, shared, stats, retry_pages)
+    try:
+        for rows_batch in batched(rows, config.CLEAN_BATCH_SIZE):
+            parsed = parse_conferences(rows_batch, stats, executor)
+            batch = geocode_conferences(parsed, batch_geocoder, stats)
+            # Only transient geocoder failures are retried; locations not found stay negatively cached
+            failed = [
+                conf for conf in parsed
+                if conf["lat"] is None and normalize_location(conf["location"]) in batch_geocoder.failed_locations
+            ]
+            retry_pages.update(conf["page_url"] for conf in failed)
+            processed.update((conf["listing_key"], GEOCODING_FAILED) for conf in failed)
+            last_raw_id = rows_batch[-1][0]
+
+            def commit_progress(cur):
+                # Shared conferences and pages to retry are recorded with the batch, so a resumed
+                # clean doesn't miss them
+                if shared:
+                    link_conferences(shared, category, cur)
+                    shared.clear()
+                if retry_pages:
+                    mark_retry_pages(retry_pages, category, cur)
+                    retry_pages.clear()
+                if checkpoint:
+                    checkpoint(cur, last_raw_id, stats)
+            store_cleaned_conferences(batch, category, write_conn, commit_progress)
+            processed.update((conf["listing_key"], conf["identity_key"]) for conf in batch)
+        with write_conn.cursor() as cur:
+            if shared:
+                link_conferences(shared, category, cur)
+            if retry_pages:
+                mark_retry_pages(retry_pages, category, cur)
+            mark_pages_cleaned(category, cur)
+        write_conn.commit()
+        read_conn.commit()
+    except psycopg2.Error as e:
+        read_conn.rollback()
+        write_conn.rollback()
+        # Let later categories retry the conferences this one didn't get to store
+        for key in [key for key, identity_key in processed.items() if identity_key is None]:
+            del processed[key]
+        print(f"Error cleaning {category}: {e}")
+        return None
+
+    if stats["accepted"] or stats["shared"]:
+        print(f"\nCategory {category} statistics:")
+        print(f"Total conferences processed: {stats['total']}")
+        print(f"Already processed for another category: {stats['shared']}")
+        print(f"Filtered due to missing location: {stats['no_location']}")
+        print(f"Filtered due to invalid dates: {stats['no_dates']}")
+        print(f"Unparseable CFP deadlines: {stats['unparsed_cfp']}")
+        print(f"Accepted conferences: {stats['accepted']}")
+    else:
+        print(f"\nNo valid conferences found for {category}")
+    return stats
+
+def geocoding_delta(before, after):
+    """
+    Geocoding counters accumulated between two BatchGeocoder.stats() readings (or, with before
+    empty, summed over categories), with the offline and cache hit rates and the geocoder's
+    average latency over them.
+    """
+    delta = {key: after.get(key, 0) - before.get(key, 0) for key in GEOCODING_COUNTERS}
+    delta["lookup_seconds"] = round(delta["lookup_seconds"], 6)
+    cached = delta["cache_hits"] + delta["negative_cache_hits"]
+    cache_lookups = cached + delta["remote"]
+    resolved = delta["offline"] + cache_lookups
+    delta["offline_rate"] = round(delta["offline"] / resolved, 4) if resolved else 0.0
+    delta["cache_hit_rate"] = round(cached / cache_lookups, 4) if cache_lookups else 0.0
+    delta["lookup_seconds_avg"] = round(delta["lookup_seconds"] / delta["lookups"], 6) if delta["lookups"] else 0.0
+    return delta
+
+def write_run_summary(path, started_at, full_refresh, timings, published):
+    """
+    Write a machine-readable summary of the run: per-category timings and counters for each stage,
+    their totals, and the published data version.
+    """
+    totals = {
+        "categories": len(timings),
+        "failed_categories": sorted(category for category, t in timings.items() if t["error"]),
+        "crawl_seconds": round(sum(t["crawl_seconds"] for t in timings.values()), 3),
+        "clean_seconds": round(sum(t["clean_seconds"] for t in timings.values()), 3),
+        "pages_fetched": sum(t["crawl"]["pages_fetched"] for t in timings.values()),
+        "items_ingested": sum(t["crawl"]["items_ingested"] for t in timings.values()),
+        "conferences_processed": sum(t["clean"]["total"] for t in timings.values() if t["clean"]),
+        "conferences_shared": sum(t["clean"]["shared"] for t in timings.values() if t["clean"]),
+        "rows_written": sum(t["clean"]["accepted"] for t in timings.values() if t["clean"]),
+    }
+    geocoding = [t["geocoding"] for t in timings.values() if t["geocoding"]]
+    summed = {key: sum(g.get(key, 0) for g in geocoding) for key in GEOCODING_COUNTERS}
+    totals.update({f"geocoding_{key}": value for key, value in geocoding_delta({}, summed).items()})
+
+    finished_at = datetime.now()
+    summary = {
+        "started_at": started_at.isoformat(),
+        "finished_at": finished_at.isoformat(),
+        "wall_seconds": round((finished_at - started_at).total_seconds(), 3),
+        "full_refresh": full_refresh,
+        "published": published,
+        "totals": totals,
+        "categories": timings,
+    }
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    print(f"Run summary written to {path}")
+
+def refresh_categories(categories, incremental=False, geocoder=None, run=None):
+    """
+    Scrape and clean categories as a two-stage pipeline, so that the network-bound crawl and the
+    network-bound geocoding overlap. Crawling runs in a background process; each category is handed
+    to the cleaning stage through a queue as soon as its crawl completes.
+
+    Crawls take a credit before starting and the cleaning stage returns it once the category is
+    stored, so crawling can't run more than REFRESH_MAX_PENDING_CATEGORIES categories ahead of cleaning.
+    Returns per-category timings for each stage, along with the category's crawl, cleaning and
+    geocoding counters.
+
+    With a run (a run_state.RunState), progress is recorded as it's made, and picked up from where a
+    previous attempt at the run stopped: cleaned categories are skipped, crawled ones go straight to
+    cleaning from their last checkpoint, and the rest are crawled again, skipping the pages already
+    ingested. The refresh stops after the category in progress if the run is aborted.
+    """
+    events = Queue()
+    credits = Semaphore(config.REFRESH_MAX_PENDING_CATEGORIES)
+    started = time.monotonic()
+    progress = run.categories() if run else {}
+    to_crawl = [c for c in categories if progress.get(c, {}).get("crawl_status") not in (CRAWLED, CLEANED)]
+    resumed = {c for c in categories if progress.get(c, {}).get("crawl_status") == CRAWLED
+               and progress[c]["clean_status"] != CLEANED}
+    print(f"Refreshing {len(categories)} categories ({'incremental' if incremental else 'full refresh'})...")
+    if progress:
+        print(f"Resuming run {run.id}: {len(categories) - len(to_crawl) - len(resumed)} categories done, "
+              f"{len(resumed)} to clean, {len(to_crawl)} to crawl")
+
+    # Categories crawled by a previous attempt are queued for cleaning first; they hold no credits
+    for category in sorted(resumed):
+        row = progress[category]
+        events.put((category, None, row["crawl_seconds"], time.time(), row["crawl_stats"]))
+    if to_crawl:
+        crawl = start_spiders(
+            WikiCFPSpider, to_crawl, events, credits,
+            incremental=incremental, resume_since=run.started_at if run else None
+        )
+    else:
+        crawl = None
+        events.put(None)
+
+    executor = create_parse_executor()
+    read_conn, _ = get_db_connection()
+    write_conn, _ = get_db_connection()
+    batch_geocoder = BatchGeocoder(write_conn, geocoder)
+    processed = {}
+    timings = {}
+    try:
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            if isinstance(event, Exception):
+                raise event
+
+            category, error, crawl_seconds, crawled_at, crawl_stats = event
+            queue_seconds = max(0.0, time.time() - crawled_at)
+            timings[category] = {
+                "crawl_seconds": round(crawl_seconds, 3),
+                "queue_seconds": round(queue_seconds, 3),
+                "clean_seconds": 0.0,
+                "error": error,
+                "crawl": crawl_stats,
+                "clean": None,
+                "geocoding": None,
+            }
+            if run and category not in resumed:
+                run.record_crawl(category, error, crawl_seconds, queue_seconds, crawl_stats)
+            if error:
+                print(f"Error scraping {category}: {error}")
+                credits.release()
+                continue
+
+            # Geocoding counters carry on from the last checkpoint of a resumed category
+            row = progress.get(category, {})
+            geocoding_before = batch_geocoder.stats()
+            for key in GEOCODING_COUNTERS:
+                geocoding_before[key] -= (row.get("geocoding") or {}).get(key, 0)
+
+            def checkpoint(cur, last_raw_id, stats):
+                run.checkpoint(cur, category, last_raw_id, stats, geocoding_delta(geocoding_before, batch_geocoder.stats()))
+
+            clean_started = time.monotonic()
+            stats = clean_category(
+                category, read_conn, write_conn, batch_geocoder, processed, executor,
+                progress=(row.get("last_cleaned_raw_id", 0), row.get("clean_stats")),
+                checkpoint=checkpoint if run else None,
+            )
+            if stats is None:
+                timings[category]["error"] = "Cleaning failed"
+            timings[category]["clean"] = stats
+            timings[category]["geocoding"] = geocoding_delta(geocoding_before, batch_geocoder.stats())
+            timings[category]["clean_seconds"] = round(time.monotonic() - clean_started, 3)
+            if run:
+                run.record_clean(
+                    category, stats, timings[category]["geocoding"], timings[category]["clean_seconds"],
+                    timings[category]["error"]
+                )
+            if category not in resumed:
+                credits.release()
+            if run and run.aborted():
+                print(f"Run {run.id} was aborted; stopping.")
+                if crawl:
+                    crawl.terminate()
+                break
+    except BaseException:
+        # The crawl may be blocked waiting for credits that will never be returned
+        if crawl:
+            crawl.terminate()
+        raise
+    finally:
+        if crawl:
+            crawl.join()
+        if executor:
+            executor.shutdown()
+        read_conn.close()
+        write_conn.close()
+
+    batch_geocoder.print_statistics()
+
+    # Stage timing report
+    wall_seconds = time.monotonic() - started
+    print("\nRefresh timings (seconds):")
+    print(f"{'category':<28}{'crawl':>10}{'queued':>10}{'clean':>10}")
+    for category, timing in timings.items():
+        print(f"{category:<28}{timing['crawl_seconds']:>10}{timing['queue_seconds']:>10}{timing['clean_seconds']:>10}")
+    print(f"Total crawl time: {sum(t['crawl_seconds'] for t in timings.values()):.3f}")
+    print(f"Total clean time: {sum(t['clean_seconds'] for t in timings.values()):.3f}")
+    print(f"Wall time: {wall_seconds:.3f}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape, clean and store WikiCFP conference data.")
+    parser.add_argument(
+        "command", nargs="?", default="run", choices=["run", "start", "resume", "status", "abort"],
+        help="run (default): resume the unfinished run if there is one, otherwise start a new one; "
+             "start: start a new run, aborting any unfinished one; resume: resume the unfinished run; "
+             "status: show the latest run's progress; abort: abort the unfinished run"
+    )
+    parser.add_argument(
+        "--full-refresh", action="store_true",
+        help="Re-parse every listing page, instead of only pages that changed since the last run (new runs only)"
+    )
+    args = parser.parse_args()
+
+    # Initialize database if necessary
+    initialize_tables()
+    create_geolocation_cache()
+    create_conference_tables()
+    create_scraped_pages_table()
+    create_refresh_run_tables()
+
+    conn, _ = get_db_connection()
+    if args.command == "status":
+        print_run_status(conn)
+        sys.exit(0)
+    if args.command == "abort":
+        run_id = abort_run(conn)
+        print(f"Aborted run {run_id}." if run_id else "No unfinished run to abort.")
+        sys.exit(0)
+
+    run = RunState.unfinished(conn)
+    if args.command == "start" and run:
+        if not run.lock():
+            sys.exit(f"Run {run.id} is in progress in another process; abort it first.")
+        abort_run(conn)
+        run = None
+    if args.command == "resume" and run is None:
+        sys.exit("No unfinished run to resume.")
+
+    # The run is locked before anything is touched, so a process losing a race to start or resume
+    # it leaves the raw tables of the process that won alone
+    if run:
+        if not run.lock():
+            sys.exit(f"Run {run.id} is in progress in another process.")
+        if args.full_refresh and not run.full_refresh:
+            print("Ignoring --full-refresh: it only applies to new runs.")
+        print(f"Resuming run {run.id}, started {run.started_at:%Y-%m-%d %H:%M:%S}")
+    else:
+        run = RunState.start(conn, [x[1] for x in fetch_categories()], args.full_refresh)
+        if run is None:
+            sys.exit("A run is already in progress in another process.")
+        print(f"Started run {run.id}")
+    categories = list(run.categories())
+
+    if not run.prepared:
+        # Move any data left in the legacy per-category tables into the unified table.
+        # Duplicates can't accumulate there: conferences are upserted by identity key and category links
+        # are keyed on (category, conference), so resuming a run re-writes nothing twice.
+        migrate_category_tables(categories)
+        backfill_cfp_deadlines()
+        reset_raw_tables(categories)
+        run.mark_prepared()
+
+    # Scrape new data, cleaning each category as soon as its crawl completes. If this is interrupted,
+    # running again resumes the run where it stopped
+    refresh_categories(
+        categories, incremental=config.INCREMENTAL_SCRAPING and not run.full_refresh, run=run
+    )
+    if run.aborted():
+        sys.exit(f"Run {run.id} was aborted; keeping the previously published data.")
+
+    # Publish the new data to the API, unless nothing was refreshed
+    timings = run.timings()
+    if timings and all(t["error"] for t in timings.values()):
+        print("Every category failed; keeping the previously published data.")
+        published = None
+    else:
+        published = publish_snapshot()
+    run.finish(published)
+    write_run_summary(config.RUN_SUMMARY_PATH, run.started_at, run.full_refresh, timings, published)
+    conn.close()
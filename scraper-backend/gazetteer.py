@@ -0,0 +1,201 @@
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+
+# Bundled dataset: countries.tsv, admin1.tsv and cities.tsv, in the formats described in their headers
+DEFAULT_PATH = Path(__file__).parent / "data"
+
+# Countries whose first-level regions (states, provinces) are commonly written in location strings
+ADMIN1_COUNTRIES = {"US", "CA", "AU"}
+
+# GeoNames admin1 codes of Canadian and Australian regions; US regions use their postal codes there
+GEONAMES_ADMIN1_CODES = {
+    "CA": {
+        "01": "Alberta", "02": "British Columbia", "03": "Manitoba", "04": "New Brunswick",
+        "05": "Newfoundland and Labrador", "07": "Nova Scotia", "08": "Ontario", "09": "Prince Edward Island",
+        "10": "Quebec", "11": "Saskatchewan", "12": "Yukon", "13": "Northwest Territories", "14": "Nunavut",
+    },
+    "AU": {
+        "01": "Australian Capital Territory", "02": "New South Wales", "03": "Northern Territory",
+        "04": "Queensland", "05": "South Australia", "06": "Tasmania", "07": "Victoria", "08": "Western Australia",
+    },
+}
+
+# Trailing words tried as a country or region in locations without commas, e.g. "Paris France"
+MAX_TRAILING_WORDS = 3
+
+
+def normalize_place_name(text):
+    """
+    Accent-free, lowercase text, with punctuation replaced by spaces and runs of whitespace collapsed.
+    "São Paulo, Brazil" and "Sao Paulo Brazil" both normalize to "sao paulo brazil".
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text.replace("'", "")).split())
+
+
+def word_suffixes(words):
+    """
+    Trailing runs of words as candidate city names, longest last since parts are tried from the end:
+    "in new york" gives ["york", "new york", "in new york"].
+    """
+    return [" ".join(words[i:]) for i in range(len(words) - 1, -1, -1)]
+
+
+def read_tsv(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+
+class Gazetteer:
+    """
+    In-memory resolver for "City, Country"-style location strings, using a bundled city dataset.
+
+    Names and aliases are indexed by their normalized form, so a lookup is a few dict probes:
+    trailing parts of the location are matched against countries and regions, then the remaining
+    parts against cities in that country (and region), preferring the most populous. Locations it
+    can't place confidently, such as a bare country or an unknown city, return None, to be left
+    to the remote geocoder.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        path = Path(path)
+        self.countries = {}  # normalized name -> country code
+        self.regions = {}  # normalized name -> [(country code, region)]
+        self.cities = {}  # normalized name -> [(country code, region, lat, lon, population)]
+
+        for code, names in read_tsv(path / "countries.tsv"):
+            for name in names.split("|"):
+                self.countries[normalize_place_name(name)] = code
+        for code, names in read_tsv(path / "admin1.tsv"):
+            names = names.split("|")
+            region = normalize_place_name(names[0])
+            for name in names:
+                self.regions.setdefault(normalize_place_name(name), []).append((code, region))
+        for names, code, region, lat, lon, population in read_tsv(path / "cities.tsv"):
+            entry = (code, normalize_place_name(region) or None, float(lat), float(lon), int(population))
+            for name in {normalize_place_name(name) for name in names.split("|")}:
+                self.cities.setdefault(name, []).append(entry)
+        for entries in self.cities.values():
+            entries.sort(key=lambda entry: -entry[4])
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.cities.values())
+
+    def lookup(self, location):
+        """
+        Coordinates of a location string as a (lat, lon) tuple, or None if it can't be placed offline.
+        """
+        parts = [part for part in map(normalize_place_name, (location or "").split(",")) if part]
+        if not parts:
+            return None
+        if len(parts) > 1:
+            return self._resolve(parts)
+
+        # No commas: try the trailing words as a country or region, and the words before them as a city
+        words = parts[0].split()
+        for n in range(min(MAX_TRAILING_WORDS, len(words) - 1), 0, -1):
+            tail = " ".join(words[-n:])
+            if tail in self.countries or tail in self.regions:
+                coordinates = self._resolve(word_suffixes(words[:-n]) + [tail])
+                if coordinates:
+                    return coordinates
+        return self._resolve(word_suffixes(words))
+
+    def _resolve(self, parts):
+        for country, region, remaining in self._contexts(parts):
+            # The city is usually the part nearest the country, after any venue or street
+            for part in reversed(remaining):
+                city = self._match_city(part, country, region)
+                if city:
+                    return city
+        return None
+
+    def _contexts(self, parts):
+        """
+        Readings of the location's trailing parts, as (country, region, remaining parts), most specific first.
+        A part like "Georgia" yields both its country and its region reading. Only when the location
+        names neither is its city looked up worldwide, and only when it names no region is its city
+        looked up country-wide.
+        """
+        readings = []
+        last = parts[-1]
+        if last in self.countries:
+            country = self.countries[last]
+            rest = parts[:-1]
+            regions = []
+            if country in ADMIN1_COUNTRIES and len(rest) > 1:
+                regions = [region for code, region in self.regions.get(rest[-1], ()) if code == country]
+                readings.extend((country, region, rest[:-1]) for region in regions)
+            # Without a region, the country alone is tried, including as a city, as city-states like
+            # "Singapore" are both. A named region isn't dropped: a city missing from it is left unplaced
+            if not regions:
+                readings.append((country, None, [last] + rest))
+        for code, region in self.regions.get(last, ()):
+            readings.append((code, region, parts[:-1]))
+        return readings or [(None, None, parts)]
+
+    def _match_city(self, name, country, region):
+        for code, city_region, lat, lon, _ in self.cities.get(name, ()):
+            if country and code != country:
+                continue
+            if region and city_region and city_region != region:
+                continue
+            return lat, lon
+        return None
+
+
+def load_gazetteer(path=None):
+    """
+    The gazetteer at path (by default the bundled dataset), or None if its files are missing.
+    """
+    try:
+        gazetteer = Gazetteer(path or DEFAULT_PATH)
+    except FileNotFoundError as e:
+        print(f"Gazetteer not loaded, geocoding remotely only: {e}")
+        return None
+    print(f"Loaded gazetteer with {len(gazetteer)} cities")
+    return gazetteer
+
+
+def convert_geonames(source, destination):
+    """
+    Convert a GeoNames cities dump (e.g. cities15000.txt) into the gazetteer's cities.tsv format.
+    Regions are kept for ADMIN1_COUNTRIES: US ones mapped from their postal codes, Canadian and
+    Australian ones from GEONAMES_ADMIN1_CODES. Other countries' regions are left out.
+    """
+    admin1 = {
+        (code, number): region
+        for code, regions in GEONAMES_ADMIN1_CODES.items() for number, region in regions.items()
+    }
+    for code, names in read_tsv(DEFAULT_PATH / "admin1.tsv"):
+        if code == "US":
+            names = names.split("|")
+            admin1.update({(code, alias): names[0] for alias in names[1:]})
+
+    rows = []
+    for fields in read_tsv(source):
+        name, ascii_name, lat, lon, code, admin1_code, population = (
+            fields[1], fields[2], fields[4], fields[5], fields[8], fields[10], fields[14]
+        )
+        names = [name] if name == ascii_name else [name, ascii_name]
+        region = admin1.get((code, admin1_code), "")
+        rows.append((code, "|".join(names), region, lat, lon, population or "0"))
+
+    with open(destination, "w", encoding="utf-8") as f:
+        f.write("# Converted from a GeoNames cities dump\n")
+        for code, names, region, lat, lon, population in sorted(rows):
+            f.write(f"{names}\t{code}\t{region}\t{lat}\t{lon}\t{population}\n")
+    print(f"Wrote {len(rows)} cities to {destination}")
+
+
+if __name__ == "__main__":
+    # python gazetteer.py <cities15000.txt> [destination], from https://download.geonames.org/export/dump/
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python gazetteer.py <geonames cities file> [destination]")
+    convert_geonames(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH / "cities.tsv")
@@ -0,0 +1,255 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from geopy.exc import GeopyError
+from geopy.geocoders import Nominatim
+from psycopg2.extras import execute_values
+
+import config
+from gazetteer import load_gazetteer, normalize_place_name
+
+
+# Location strings that never resolve to a place, normalized
+UNGEOCODABLE_LOCATIONS = {"virtual conference", "", "n a", "hybrid", "online", "publication"}
+
+# Returned by a worker when the geocoder kept erroring, as opposed to finding nothing
+_FAILED = object()
+
+
+# Loaded on first use, and shared by every BatchGeocoder in the process
+_gazetteer = None
+
+
+def normalize_location(location_name):
+    """
+    Key under which a location is cached. Case, accents, punctuation and spacing are ignored,
+    so "Paris, France" and "Paris France" share a key.
+    """
+    return normalize_place_name(location_name)
+
+
+def default_gazetteer():
+    """
+    The offline gazetteer at GAZETTEER_PATH, or None if it's disabled or missing.
+    """
+    global _gazetteer
+    if _gazetteer is None and config.GAZETTEER_ENABLED:
+        _gazetteer = load_gazetteer(config.GAZETTEER_PATH) or False
+    return _gazetteer or None
+
+
+def create_geocoder():
+    """
+    Nominatim client. The domain and scheme are configurable so runs can be pointed
+    at a local stub geocoder instead of the public service.
+    """
+    return Nominatim(
+        user_agent=config.GEOCODER_USER_AGENT,
+        domain=config.GEOCODER_DOMAIN,
+        scheme=config.GEOCODER_SCHEME,
+        timeout=config.GEOCODER_TIMEOUT
+    )
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least 1/rate seconds apart, across all threads sharing it.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+class BatchGeocoder:
+    """
+    Resolves a batch of location strings to coordinates in one go:
+    1. Distinct locations are normalized, and known non-places dropped
+    2. Locations the offline gazetteer can place are resolved in memory, without a network call
+    3. Cached locations are read with a single query
+    4. Misses are geocoded by a bounded pool of workers sharing one rate limiter, with retry/backoff
+    5. Results are written back to the cache, including locations the geocoder couldn't find,
+       which aren't retried until their retry_after timestamp passes
+
+    Any object with a geopy-style geocode(query) method can stand in for the geocoder, and any
+    object with a lookup(location) method for the gazetteer.
+    """
+
+    def __init__(self, conn, geocoder=None, gazetteer=None):
+        self.conn = conn
+        self.geocoder = geocoder or create_geocoder()
+        self.gazetteer = gazetteer or default_gazetteer()
+        self.rate_limiter = RateLimiter(config.GEOCODER_RATE_LIMIT)
+        self.workers = config.GEOCODER_WORKERS
+        self.retries = config.GEOCODER_RETRIES
+        # Locations the geocoder failed on with errors (timeouts, rate limiting), rather than not finding
+        self.failed_locations = set()
+        self.backoff = config.GEOCODER_BACKOFF
+        self.negative_ttl = timedelta(days=config.GEOCODER_NEGATIVE_TTL_DAYS)
+
+        # Statistics tracking
+        self.offline = 0
+        self.cache_hits = 0
+        self.negative_cache_hits = 0
+        self.geocoded = 0
+        self.not_found = 0
+        self.failed = 0
+        self.lookups = 0
+        self.lookup_seconds_total = 0.0
+        self.lookup_seconds_max = 0.0
+        self._stats_lock = threading.Lock()
+
+    def resolve(self, locations):
+        """
+        Map each normalized location to a (lat, lon) tuple, or None if it can't be placed.
+        """
+        # Keep a location string per key, as listed, to query the geocoder with
+        queries = {}
+        for location in locations:
+            queries.setdefault(normalize_location(location), (location or "").strip())
+        results = {key: None for key in queries if key in UNGEOCODABLE_LOCATIONS}
+
+        # Resolve what we can offline
+        if self.gazetteer:
+            for key in queries.keys() - results.keys():
+                coordinates = self.gazetteer.lookup(queries[key])
+                if coordinates:
+                    results[key] = coordinates
+                    self.offline += 1
+        pending = sorted(queries.keys() - results.keys())
+        if not pending:
+            return results
+
+        # Resolve what we can from the cache
+        now = datetime.now()
+        cached = self._lookup_cache(pending)
+        misses = []
+        for key in pending:
+            row = cached.get(key)
+            if row is None:
+                misses.append(key)
+            elif row[0] is not None:
+                results[key] = (row[0], row[1])
+                self.cache_hits += 1
+            elif row[2] is not None and row[2] > now:
+                results[key] = None
+                self.negative_cache_hits += 1
+            else:
+                misses.append(key)
+
+        # Geocode the rest concurrently; the rate limiter keeps us within the service's usage policy
+        if misses:
+            print(f"Geocoding {len(misses)} uncached locations...")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                geocoded = dict(zip(misses, executor.map(self._geocode, (queries[key] for key in misses))))
+            self._store(geocoded, now)
+            for key, coordinates in geocoded.items():
+                results[key] = None if coordinates is _FAILED else coordinates
+                if coordinates is _FAILED:
+                    self.failed_locations.add(key)
+                else:
+                    self.failed_locations.discard(key)
+
+        return results
+
+    def _lookup_cache(self, keys):
+        with self.conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT location, lat, lon, retry_after FROM {config.GEOLOCATION_TABLE} WHERE location = ANY(%s);
+            """, (keys,))
+            return {row[0]: row[1:] for row in cur.fetchall()}
+
+    def _geocode(self, query):
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            start = time.monotonic()
+            try:
+                location = self.geocoder.geocode(query)
+            except GeopyError as e:
+                self._record_lookup(time.monotonic() - start)
+                if attempt == self.retries:
+                    print(f"Geocoding failed for '{query}' after {attempt + 1} attempts: {e}")
+                    return _FAILED
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            self._record_lookup(time.monotonic() - start)
+            return (location.latitude, location.longitude) if location else None
+
+    def _record_lookup(self, seconds):
+        with self._stats_lock:
+            self.lookups += 1
+            self.lookup_seconds_total += seconds
+            self.lookup_seconds_max = max(self.lookup_seconds_max, seconds)
+
+    def _store(self, geocoded, now):
+        """
+        Persist hits, and misses with a retry-after timestamp. Locations that failed with errors
+        aren't stored, so they're retried on the next run.
+        """
+        rows = []
+        for key, coordinates in geocoded.items():
+            if coordinates is _FAILED:
+                self.failed += 1
+            elif coordinates is None:
+                self.not_found += 1
+                rows.append((key, None, None, now + self.negative_ttl))
+            else:
+                self.geocoded += 1
+                rows.append((key, coordinates[0], coordinates[1], None))
+        if not rows:
+            return
+        with self.conn.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO {config.GEOLOCATION_TABLE} (location, lat, lon, retry_after) VALUES %s
+                ON CONFLICT (location) DO UPDATE
+                SET lat = EXCLUDED.lat, lon = EXCLUDED.lon, retry_after = EXCLUDED.retry_after;
+            """, rows)
+        self.conn.commit()
+
+    def stats(self):
+        """
+        Counters so far, with the share of locations resolved offline, the cache hit rate over all
+        cache lookups and the geocoder's per-request latency (excluding time spent waiting on the
+        rate limiter). Remote counts locations sent to the geocoder, whatever the outcome.
+        """
+        remote = self.geocoded + self.not_found + self.failed
+        cache_lookups = self.cache_hits + self.negative_cache_hits + remote
+        resolved = self.offline + cache_lookups
+        return {
+            "offline": self.offline,
+            "remote": remote,
+            "offline_rate": round(self.offline / resolved, 4) if resolved else 0.0,
+            "cache_hits": self.cache_hits,
+            "negative_cache_hits": self.negative_cache_hits,
+            "geocoded": self.geocoded,
+            "not_found": self.not_found,
+            "failed": self.failed,
+            "cache_hit_rate": round((self.cache_hits + self.negative_cache_hits) / cache_lookups, 4) if cache_lookups else 0.0,
+            "lookups": self.lookups,
+            "lookup_seconds": round(self.lookup_seconds_total, 6),
+            "lookup_seconds_avg": round(self.lookup_seconds_total / self.lookups, 6) if self.lookups else 0.0,
+            "lookup_seconds_max": round(self.lookup_seconds_max, 6),
+        }
+
+    def print_statistics(self):
+        stats = self.stats()
+        print("\nGeocoding statistics:")
+        print(f"Resolved offline: {stats['offline']} ({stats['offline_rate']:.1%})")
+        print(f"Sent to the geocoder: {stats['remote']}")
+        print(f"Cache hits: {stats['cache_hits']}")
+        print(f"Cached as not found: {stats['negative_cache_hits']}")
+        print(f"Geocoded: {stats['geocoded']}")
+        print(f"Not found: {stats['not_found']}")
+        print(f"Failed: {stats['failed']}")
+        print(f"Cache hit rate: {stats['cache_hit_rate']:.1%}")
+        print(f"Geocoder latency: {stats['lookup_seconds_avg']:.3f}s avg, {stats['lookup_seconds_max']:.3f}s max")
@@ -0,0 +1,84 @@
+import re
+from datetime import datetime
+
+
+# Functions here are pure, and only import the standard library, so they can run in worker processes
+
+
+def parse_cfp_deadline(cfp):
+    """
+    Parse a WikiCFP submission deadline such as "Mar 1, 2025" or "Mar 1, 2025 (Feb 15, 2025)",
+    where the parenthesised date is an earlier abstract deadline and is ignored.
+    Returns a (deadline, status) tuple, with status one of "parsed", "missing" or "invalid".
+    """
+    text = (cfp or "").split(" (")[0].strip()
+    if text.lower() in {"", "tbd", "n/a"}:
+        return None, "missing"
+    try:
+        return datetime.strptime(text, "%b %d, %Y"), "parsed"
+    except ValueError:
+        return None, "invalid"
+
+
+def normalize_identity_text(text):
+    """
+    Lowercase text, with punctuation dropped and runs of whitespace collapsed.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def conference_identity(name, abbreviation, start_date):
+    """
+    Key identifying a conference across categories and runs: its normalized name and abbreviation,
+    and its start date. Listings that differ only in case, spacing or punctuation share a key.
+    """
+    start = start_date.strftime("%Y-%m-%d") if start_date else ""
+    return f"{normalize_identity_text(name)}|{normalize_identity_text(abbreviation)}|{start}"
+
+
+def listing_key(row):
+    """
+    Key of a conference's raw WikiCFP listing, i.e. its identity fields before parsing, with the
+    start date still as listed. Categories listing the same conference produce the same key.
+    """
+    abbreviation, name, dates = row[:3]
+    start = (dates or "").split(" - ")[0]
+    return f"{normalize_identity_text(name)}|{normalize_identity_text(abbreviation)}|{start.strip().lower()}"
+
+
+def parse_conference(row):
+    """
+    Parse a raw row, (abbreviation, name, dates, location, cfp) as listed, into a conference dict.
+    Returns (conference, None), or (None, reason) if the conference has no valid dates.
+    """
+    abbreviation, name, dates, location, cfp = row
+    conference_data = {
+        "abbreviation": abbreviation,
+        "name": name,
+        "dates": dates,
+        "location": location,
+        "cfp": cfp,
+        "cfp_deadline": None,
+        "cfp_parse_status": None,
+        "start_date": None,
+        "end_date": None,
+        "lat": None,
+        "long": None,
+        "listing_key": listing_key(row),
+    }
+
+    # Date parsing - skip if invalid dates
+    try:
+        start_str, end_str = dates.split(" - ")
+        conference_data["start_date"] = datetime.strptime(start_str, "%b %d, %Y")
+        conference_data["end_date"] = datetime.strptime(end_str, "%b %d, %Y")
+    except Exception as e:
+        return None, f"Invalid date format '{dates}': {e}"
+
+    # Parse the submission deadline once, here, so the API can filter on a typed column.
+    # An unparseable deadline doesn't disqualify the conference; its status is recorded instead
+    conference_data["cfp_deadline"], conference_data["cfp_parse_status"] = parse_cfp_deadline(cfp)
+    conference_data["identity_key"] = conference_identity(
+        conference_data["name"], conference_data["abbreviation"], conference_data["start_date"]
+    )
+    return conference_data, None
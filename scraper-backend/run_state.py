@@ -0,0 +1,267 @@
+from psycopg2 import errors
+from psycopg2.extras import Json, RealDictCursor
+
+import config
+
+
+# Statuses of a run, and of each category's crawl and cleaning stages within it
+RUNNING, COMPLETED, ABORTED = "running", "completed", "aborted"
+PENDING, CRAWLED, CLEANED, FAILED = "pending", "crawled", "cleaned", "failed"
+
+
+def create_run_tables(cur):
+    """
+    Create the tables recording each refresh run and its per-category progress, if they don't exist.
+
+    A category's crawl is recorded once it finishes (the pages it ingested are in scraped_pages), and
+    its cleaning is checkpointed after every batch, with the id of the last raw row handled and the
+    cleaning and geocoding counters so far, in the same transaction as the batch's conferences.
+    """
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.RUNS_TABLE} (
+            id SERIAL PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT '{RUNNING}',
+            full_refresh BOOLEAN NOT NULL,
+            prepared BOOLEAN NOT NULL DEFAULT FALSE,
+            started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            finished_at TIMESTAMP,
+            published JSONB
+        );
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.RUN_CATEGORIES_TABLE} (
+            run_id INTEGER NOT NULL REFERENCES {config.RUNS_TABLE} (id) ON DELETE CASCADE,
+            category TEXT NOT NULL,
+            crawl_status TEXT NOT NULL DEFAULT '{PENDING}',
+            crawl_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+            queue_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+            crawl_stats JSONB,
+            clean_status TEXT NOT NULL DEFAULT '{PENDING}',
+            clean_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+            last_cleaned_raw_id INTEGER NOT NULL DEFAULT 0,
+            clean_stats JSONB,
+            geocoding JSONB,
+            error TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (run_id, category)
+        );
+    """)
+    cur.execute(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_refresh_runs_running ON {config.RUNS_TABLE} (status)
+        WHERE status = '{RUNNING}';
+    """)
+
+
+class RunState:
+    """
+    Progress of one refresh run, as recorded in the run tables, so an interrupted run can be resumed:
+    crawled categories aren't crawled again, a partly crawled category skips the pages it already
+    ingested, and cleaning picks up after the last raw row checkpointed.
+
+    At most one run is unfinished at a time. Only one process may work on it: the run's connection
+    holds a session-level advisory lock, released when the process exits, however it exits.
+    """
+
+    def __init__(self, conn, run):
+        self.conn = conn
+        self.id = run["id"]
+        self.full_refresh = run["full_refresh"]
+        self.prepared = run["prepared"]
+        self.started_at = run["started_at"]
+
+    @classmethod
+    def start(cls, conn, categories, full_refresh):
+        """
+        Record a new run, locked by this process before it's visible to others, or return None if
+        another process started one in the meantime. The run still needs preparing; see prepared.
+        """
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            try:
+                cur.execute(f"""
+                    INSERT INTO {config.RUNS_TABLE} (full_refresh) VALUES (%s) RETURNING *;
+                """, (full_refresh,))
+            except errors.UniqueViolation:
+                # Only one run may be running at a time, see idx_refresh_runs_running
+                conn.rollback()
+                return None
+            run = cur.fetchone()
+            cur.executemany(f"""
+                INSERT INTO {config.RUN_CATEGORIES_TABLE} (run_id, category) VALUES (%s, %s);
+            """, [(run["id"], category) for category in categories])
+            # Session-level, so held past the commit
+            cur.execute("SELECT pg_advisory_lock(hashtext(%s), %s);", (config.RUNS_TABLE, run["id"]))
+        conn.commit()
+        return cls(conn, run)
+
+    @classmethod
+    def unfinished(cls, conn):
+        """
+        The run still in progress (or interrupted), or None.
+        """
+        run = latest_run(conn, unfinished=True)
+        return cls(conn, run) if run else None
+
+    def lock(self):
+        """
+        Take the run's advisory lock, returning False if another process holds it.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(hashtext(%s), %s);", (config.RUNS_TABLE, self.id))
+            locked = cur.fetchone()[0]
+        self.conn.commit()
+        return locked
+
+    def mark_prepared(self):
+        """
+        Record that the run's raw tables were reset, so resuming it doesn't reset them again.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(f"UPDATE {config.RUNS_TABLE} SET prepared = TRUE WHERE id = %s;", (self.id,))
+        self.conn.commit()
+        self.prepared = True
+
+    def categories(self):
+        """
+        Per-category progress rows, keyed by category.
+        """
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"""
+                SELECT * FROM {config.RUN_CATEGORIES_TABLE} WHERE run_id = %s ORDER BY category;
+            """, (self.id,))
+            rows = cur.fetchall()
+        self.conn.commit()
+        return {row["category"]: row for row in rows}
+
+    def aborted(self):
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT status FROM {config.RUNS_TABLE} WHERE id = %s;", (self.id,))
+            status = cur.fetchone()[0]
+        self.conn.commit()
+        return status == ABORTED
+
+    def record_crawl(self, category, error, crawl_seconds, queue_seconds, crawl_stats):
+        self._update(category, """
+            crawl_status = %s, crawl_seconds = crawl_seconds + %s, queue_seconds = %s, crawl_stats = %s, error = %s
+        """, (FAILED if error else CRAWLED, crawl_seconds, queue_seconds, Json(crawl_stats), error))
+
+    def checkpoint(self, cur, category, last_raw_id, stats, geocoding):
+        """
+        Record cleaning progress through last_raw_id, on the cursor whose transaction wrote the batch.
+        """
+        cur.execute(f"""
+            UPDATE {config.RUN_CATEGORIES_TABLE}
+            SET last_cleaned_raw_id = %s, clean_stats = %s, geocoding = %s, updated_at = NOW()
+            WHERE run_id = %s AND category = %s;
+        """, (last_raw_id, Json(stats), Json(geocoding), self.id, category))
+
+    def record_clean(self, category, stats, geocoding, clean_seconds, error):
+        self._update(category, """
+            clean_status = %s, clean_seconds = clean_seconds + %s, clean_stats = COALESCE(%s, clean_stats),
+            geocoding = %s, error = %s
+        """, (FAILED if error else CLEANED, clean_seconds, Json(stats) if stats else None, Json(geocoding), error))
+
+    def _update(self, category, assignments, params):
+        with self.conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE {config.RUN_CATEGORIES_TABLE} SET {assignments}, updated_at = NOW()
+                WHERE run_id = %s AND category = %s;
+            """, (*params, self.id, category))
+            cur.execute(f"UPDATE {config.RUNS_TABLE} SET updated_at = NOW() WHERE id = %s;", (self.id,))
+        self.conn.commit()
+
+    def timings(self):
+        """
+        Per-category timings and counters for every stage reached, in the form refresh_categories
+        returns them, covering every attempt at the run.
+        """
+        return {
+            category: {
+                "crawl_seconds": round(row["crawl_seconds"], 3),
+                "queue_seconds": round(row["queue_seconds"], 3),
+                "clean_seconds": round(row["clean_seconds"], 3),
+                "error": row["error"],
+                "crawl": row["crawl_stats"],
+                "clean": row["clean_stats"] if row["clean_status"] == CLEANED else None,
+                "geocoding": row["geocoding"],
+            }
+            for category, row in self.categories().items()
+            if row["crawl_status"] != PENDING
+        }
+
+    def finish(self, published):
+        with self.conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE {config.RUNS_TABLE} SET status = %s, finished_at = NOW(), updated_at = NOW(), published = %s
+                WHERE id = %s AND status = %s;
+            """, (COMPLETED, Json(published) if published else None, self.id, RUNNING))
+        self.conn.commit()
+
+
+def latest_run(conn, unfinished=False):
+    """
+    The most recent run, or only considering unfinished runs, the one in progress; None if there's none.
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT * FROM {config.RUNS_TABLE} WHERE %s OR status = %s ORDER BY id DESC LIMIT 1;
+        """, (not unfinished, RUNNING))
+        run = cur.fetchone()
+    conn.commit()
+    return run
+
+
+def abort_run(conn):
+    """
+    Mark the unfinished run as aborted, returning its id, or None if there was none. A process still
+    working on it stops after the category in progress, without publishing; the next run starts afresh.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE {config.RUNS_TABLE} SET status = %s, finished_at = NOW(), updated_at = NOW()
+            WHERE status = %s RETURNING id;
+        """, (ABORTED, RUNNING))
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else None
+
+
+def print_run_status(conn):
+    """
+    Print the latest run and the progress of each of its categories. Pages crawled are counted
+    live from scraped_pages, so crawls in progress are included.
+    """
+    run = latest_run(conn)
+    if run is None:
+        print("No refresh runs recorded.")
+        return
+    print(
+        f"Run {run['id']} ({'full refresh' if run['full_refresh'] else 'incremental'}): {run['status']}, "
+        f"started {run['started_at']:%Y-%m-%d %H:%M:%S}, last progress {run['updated_at']:%Y-%m-%d %H:%M:%S}"
+        + (f", finished {run['finished_at']:%Y-%m-%d %H:%M:%S}" if run["finished_at"] else "")
+    )
+    if run["published"]:
+        print(f"Published data version {run['published']['data_version']}")
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT rc.*, (
+                SELECT COUNT(*) FROM {config.SCRAPED_PAGES_TABLE} p
+                WHERE p.category = rc.category AND p.fetched_at >= %s
+            ) AS pages_crawled
+            FROM {config.RUN_CATEGORIES_TABLE} rc
+            WHERE rc.run_id = %s
+            ORDER BY rc.category;
+        """, (run["started_at"], run["id"]))
+        rows = cur.fetchall()
+    conn.commit()
+
+    print(f"{'category':<28}{'crawl':>10}{'pages':>8}{'clean':>10}{'last raw id':>13}{'accepted':>10}  error")
+    for row in rows:
+        accepted = (row["clean_stats"] or {}).get("accepted", 0)
+        print(
+            f"{row['category']:<28}{row['crawl_status']:>10}{row['pages_crawled']:>8}{row['clean_status']:>10}"
+            f"{row['last_cleaned_raw_id']:>13}{accepted:>10}  {row['error'] or ''}"
+        )
+    done = sum(row["clean_status"] == CLEANED for row in rows)
+    print(f"{done}/{len(rows)} categories cleaned")
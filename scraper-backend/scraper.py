@@ -1,86 +1,346 @@
+import hashlib
+import sys
+import time
+
+import psycopg2
 import scrapy
 import scrapy.crawler as crawler
 from scrapy.utils.project import get_project_settings
 from multiprocessing import Process, Queue
-from twisted.internet import reactor
+from twisted.internet import defer, reactor, threads
 
 import config
 
+
+def load_crawl_state(category):
+    """
+    Retrieve what previous runs recorded for a category: the state of each listing page
+    (content hash, HTTP validators, next page link, when it was last ingested and whether its rows
+    were cleaned) keyed by URL, and the names of conferences already stored for the category.
+    """
+    conn = psycopg2.connect(
+        dbname=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        host=config.DB_HOST,
+        port=config.DB_PORT
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT url, content_hash, etag, last_modified, next_url, fetched_at, cleaned
+                FROM {config.SCRAPED_PAGES_TABLE} WHERE category = %s;
+            """, (category,))
+            pages = {
+                row[0]: {
+                    "content_hash": row[1], "etag": row[2], "last_modified": row[3], "next_url": row[4],
+                    "fetched_at": row[5], "cleaned": row[6],
+                }
+                for row in cur.fetchall()
+            }
+            cur.execute(f"""
+                SELECT c.name
+                FROM {config.CONFERENCES_TABLE} c
+                JOIN {config.CONFERENCE_LINKS_TABLE} l ON l.conference_id = c.id
+                JOIN {config.CATEGORIES_TABLE} cc ON cc.id = l.category_id
+                WHERE cc.category = %s;
+            """, (category,))
+            known_conferences = {row[0] for row in cur.fetchall()}
+    finally:
+        conn.close()
+    return pages, known_conferences
+
+
+def listing_rows(table):
+    """
+    The stripped text of each cell, per row, of a WikiCFP listing table (an lxml element), skipping the
+    header row. Walks the tree once, rather than evaluating an XPath expression per cell.
+    """
+    rows = table.iter("tr")
+    next(rows, None)
+    for row in rows:
+        yield ["".join(cell.itertext()).strip() for cell in row.iter("td")]
+
+
+def extract_conferences(table):
+    """
+    The conferences listed in a WikiCFP listing table, as dicts of the RAW_OUTPUT_COLUMNS.
+    Conferences span two rows, (abbreviation, name) followed by (dates, location, cfp); single-cell
+    rows are section breaks (after which deadlines are past).
+    """
+    conferences = []
+    first = None
+    for cells in listing_rows(table):
+        if len(cells) <= 1:
+            first = None
+        elif first is None:
+            first = cells
+        else:
+            values = first[:2] + cells[:3]
+            conferences.append(dict(zip(config.RAW_OUTPUT_COLUMNS, values + [""] * (5 - len(values)))))
+            first = None
+    if first is not None:
+        print(f"Error processing entry '{first}': missing second row")
+    return conferences
+
+
 class WikiCFPSpider(scrapy.Spider):
     name = config.SCRAPER_NAME
     allowed_domains = [config.SCRAPER_DOMAIN]
 
-    def __init__(self, subpage=None, *args, **kwargs):
+    # Let 304 Not Modified through to parse(), for conditional requests on unchanged pages
+    handle_httpstatus_list = [304]
+
+    def __init__(self, subpage=None, incremental=False, resume_since=None, *args, **kwargs):
+        """
+        In incremental mode, listing pages whose content is unchanged since the last run aren't
+        re-parsed, and the crawl stops following "next" once a page holds only known conferences.
+
+        When resuming an interrupted run, resume_since is the time the run started: pages ingested
+        since then are skipped, following their recorded "next" links, as their rows are already stored.
+        """
         super(WikiCFPSpider, self).__init__(*args, **kwargs)
         self.page_count = 0
         self.page_maximum = config.PAGE_COUNT_MAXIMUM
+        self.incremental = incremental
+        self.resume_since = resume_since
+        self.page_state = {}
+        self.recorded_pages = {}
+        self.known_conferences = set()
         if subpage:
             self.start_urls = [config.START_URL.format(subpage)]
+            self.category = subpage
             self.subpage = subpage.replace(" ", "_")
         else:
             self.start_urls = []
 
+    def start_requests(self):
+        ingested = {}
+        if self.incremental or self.resume_since:
+            pages, known_conferences = load_crawl_state(self.category)
+            if self.incremental:
+                # Pages whose rows weren't all cleaned are fetched and parsed again, as if new
+                self.page_state = {url: page for url, page in pages.items() if page["cleaned"]}
+                self.recorded_pages = pages
+                self.known_conferences = known_conferences
+            if self.resume_since:
+                ingested = {url: page for url, page in pages.items() if page["fetched_at"] >= self.resume_since}
+        for url in self.start_urls:
+            url = self.skip_ingested(url, ingested)
+            if url:
+                yield self.page_request(url)
+
+    def skip_ingested(self, url, ingested):
+        """
+        Follow the "next" links recorded for pages already ingested during the resumed run, returning
+        the first page still to crawl, or None if there are none left.
+        """
+        while url in ingested:
+            self.crawler.stats.inc_value('resume/pages_skipped')
+            if self.page_count >= self.page_maximum:
+                return None
+            url = ingested[url]["next_url"]
+            self.page_count += 1
+        return url
+
+    def uncleaned_after(self, url):
+        """
+        Whether url, or a page after it by the recorded "next" links, was crawled but not fully cleaned.
+        """
+        seen = set()
+        while url in self.recorded_pages and url not in seen:
+            if not self.recorded_pages[url]["cleaned"]:
+                return True
+            seen.add(url)
+            url = self.recorded_pages[url]["next_url"]
+        return False
+
+    def page_request(self, url):
+        """
+        Request a listing page, conditional on the validators stored for it when crawling incrementally.
+        """
+        headers = {}
+        state = self.page_state.get(url)
+        if state:
+            if state["etag"]:
+                headers["If-None-Match"] = state["etag"]
+            if state["last_modified"]:
+                headers["If-Modified-Since"] = state["last_modified"]
+        return scrapy.Request(url, headers=headers, callback=self.parse, meta={"page_url": url})
+
     def parse(self, response):
         """
-        Grabs the table from a WikiCFPSpider page, iterates over the rows
+        Grabs the table from a WikiCFPSpider page, and yields an item per conference listed on it
         """
-        # Find table on page
-        table = response.xpath('//div[@class="contsec"]//table[@cellpadding="3" and @cellspacing="1"]')
+        page_url = response.meta.get("page_url", response.url)
+        state = self.page_state.get(page_url)
+
+        if response.status == 304:
+            # Not modified; carry on from the next page link recorded last time
+            unchanged = True
+            next_page = state["next_url"] if state else None
+        else:
+            # Find table on page
+            table = response.xpath('//div[@class="contsec"]//table[@cellpadding="3" and @cellspacing="1"]')
+            content_hash = hashlib.sha1((table.get() or "").encode()).hexdigest()
+            unchanged = self.incremental and state is not None and state["content_hash"] == content_hash
+            next_page = response.xpath('//a[contains(text(), "next")]/@href').get()
+            next_page = response.urljoin(next_page) if next_page else None
+
+        if unchanged:
+            self.crawler.stats.inc_value('incremental/pages_unchanged')
+        else:
+            conferences = extract_conferences(table[0].root) if table else []
+            for conference in conferences:
+                conference['page_url'] = page_url
+            yield from conferences
+            names = [conference['name'] for conference in conferences]
 
-        # Retrieve and iterate over rows
-        rows = table.xpath('.//tr[position() > 1]')
-        for row in rows:
-            cells = row.xpath('.//td')
-            row_data = [cell.xpath('string(.)').get().strip() for cell in cells]
-            yield {'data': "||||".join(row_data)}
+            # Record the page so the next run can tell whether it changed
+            yield {
+                'page_url': page_url,
+                'content_hash': content_hash,
+                'etag': response.headers.get('ETag', b'').decode() or None,
+                'last_modified': response.headers.get('Last-Modified', b'').decode() or None,
+                'next_url': next_page,
+            }
 
-        # Check for "next" button and follow it if it's there, up to 5 times
+            # Everything on this page is already stored, so later pages won't hold anything new either,
+            # unless one of them still has rows to clean
+            if (self.incremental and names and all(name in self.known_conferences for name in names)
+                    and not self.uncleaned_after(next_page)):
+                self.crawler.stats.inc_value('incremental/stopped_early')
+                return
+
+        # Check for "next" button and follow it if it's there, up to PAGE_COUNT_MAXIMUM times
         if self.page_count < self.page_maximum:
-            next_page = response.xpath('//a[contains(text(), "next")]/@href').get()
             if next_page:
                 self.page_count += 1
-                yield response.follow(next_page, callback=self.parse)
+                yield self.page_request(next_page)
 
 
-def run_spider(spider, subpage):
+def crawl_settings():
     """
-    Wrapper to run the spider in separate processes, to avoid issues with twisted.reactor.
+    Scrapy settings shared by all crawls: output into postgres, with per-domain concurrency and AutoThrottle
+    taken from config.
     """
+    settings = get_project_settings()
+    settings.set("ITEM_PIPELINES", {
+       'scraper_pipelines.pipelines.PostgreSQLPipeline': 100
+    }, priority='spider')
+    settings.set("CONCURRENT_REQUESTS_PER_DOMAIN", config.CONCURRENT_REQUESTS_PER_DOMAIN, priority='spider')
+    settings.set("DOWNLOAD_DELAY", config.DOWNLOAD_DELAY, priority='spider')
+    settings.set("AUTOTHROTTLE_ENABLED", config.AUTOTHROTTLE_ENABLED, priority='spider')
+    settings.set("AUTOTHROTTLE_START_DELAY", config.AUTOTHROTTLE_START_DELAY, priority='spider')
+    settings.set("AUTOTHROTTLE_MAX_DELAY", config.AUTOTHROTTLE_MAX_DELAY, priority='spider')
+    settings.set("AUTOTHROTTLE_TARGET_CONCURRENCY", config.AUTOTHROTTLE_TARGET_CONCURRENCY, priority='spider')
+    return settings
 
-    def f(q):
-        try:
-            # Set pipeline to output into postgres
-            settings = get_project_settings()
-            settings.set("ITEM_PIPELINES", {
-               'scraper_pipelines.pipelines.PostgreSQLPipeline': 100
-            }, priority='spider')
 
-            # Execute the runner over the given domain
-            runner = crawler.CrawlerRunner(settings)
-            deferred = runner.crawl(spider, subpage=subpage)
-            deferred.addBoth(lambda _: reactor.stop())
-            reactor.run()
-            q.put(None)
-        except Exception as e:
-            q.put(e)
+def crawl_statistics(stats):
+    """
+    The counters of a finished crawl worth reporting per category, from its Scrapy stats collector.
+    """
+    values = stats.get_stats() if stats else {}
+    return {
+        "pages_fetched": values.get("downloader/response_count", 0),
+        "pages_not_modified": values.get("downloader/response_status_count/304", 0),
+        "pages_unchanged": values.get("incremental/pages_unchanged", 0),
+        "pages_resumed": values.get("resume/pages_skipped", 0),
+        "stopped_early": bool(values.get("incremental/stopped_early", 0)),
+        "items_ingested": values.get("pipeline/items_written", 0),
+        "pipeline_flushes": values.get("pipeline/flushes", 0),
+        "pipeline_items_per_sec": values.get("pipeline/items_per_sec", 0.0),
+        "pipeline_flush_latency_max": values.get("pipeline/flush_latency_max", 0.0),
+        "bytes_downloaded": values.get("downloader/response_bytes", 0),
+    }
 
-    # Execute in subprocess
-    q = Queue()
-    p = Process(target=f, args=(q,))
+
+def crawl_categories(spider, subpages, events, credits=None, spider_kwargs=None):
+    """
+    Crawl all subpages concurrently in a single reactor; meant to be the target of a separate process,
+    to avoid issues with twisted.reactor. At most CRAWL_CONCURRENT_CATEGORIES crawls are in flight at once.
+
+    As each crawl finishes, (subpage, error message or None, crawl seconds, finish timestamp, crawl stats) is put
+    on the events queue, followed by a final None once every crawl is done (or the exception that stopped the reactor).
+    Crawl stats are the counters of crawl_statistics.
+    If credits (a multiprocessing semaphore) is given, one is acquired before each crawl starts, letting the
+    consumer of the events hold crawling back until it has caught up.
+    """
+    try:
+        runner = crawler.CrawlerRunner(crawl_settings())
+        semaphore = defer.DeferredSemaphore(config.CRAWL_CONCURRENT_CATEGORIES)
+
+        def crawl(subpage):
+            c = runner.create_crawler(spider)
+            started = []
+
+            def start(_):
+                started.append(time.monotonic())
+                return runner.crawl(c, subpage=subpage, **(spider_kwargs or {}))
+
+            def run():
+                deferred = threads.deferToThread(credits.acquire) if credits else defer.succeed(None)
+                return deferred.addCallback(start)
+
+            def finished(_):
+                reason = c.stats.get_value('finish_reason') if c.stats else None
+                return None if reason in (None, 'finished') else f"Crawl ended early: {reason}"
+
+            def report(error):
+                elapsed = time.monotonic() - started[0] if started else 0.0
+                events.put((subpage, error, elapsed, time.time(), crawl_statistics(c.stats)))
+
+            deferred = semaphore.run(run)
+            deferred.addCallbacks(finished, lambda failure: failure.getErrorMessage())
+            deferred.addCallback(report)
+            return deferred
+
+        deferred = defer.DeferredList([crawl(subpage) for subpage in subpages])
+        deferred.addBoth(lambda _: reactor.stop())
+        reactor.run()
+        events.put(None)
+    except Exception as e:
+        events.put(e)
+
+
+def start_spiders(spider, subpages, events, credits=None, **spider_kwargs):
+    """
+    Start crawling all subpages in a background process, reporting on the events queue as
+    each one finishes; see crawl_categories. Returns the started process.
+    Any extra keyword arguments are passed on to every spider.
+    """
+    p = Process(target=crawl_categories, args=(spider, subpages, events, credits, spider_kwargs))
     p.start()
-    result = q.get()
-    p.join()
+    return p
+
 
-    if result is not None:
-        raise result
+def run_spiders(spider, subpages, **spider_kwargs):
     """
-    # Keeping this commented for debugging when necessary
-    # Runs scraper as a foreground process, but non-repeatable 
-    settings = get_project_settings()
-    settings.set("ITEM_PIPELINES", {
-        'scraper_pipelines.pipelines.PostgreSQLPipeline': 100
-    }, priority='spider')
-    process = crawler.CrawlerProcess(settings)
-    process.crawl(spider, subpage=subpage)
-    process.start()
+    Crawl all subpages concurrently in a separate process and wait for them to finish.
+
+    A failing subpage doesn't abort the others. Returns a dict mapping each subpage to None on success,
+    or to an error message. Any extra keyword arguments are passed on to every spider.
     """
+    q = Queue()
+    p = start_spiders(spider, subpages, q, **spider_kwargs)
+    results = {}
+    while True:
+        event = q.get()
+        if event is None:
+            break
+        if isinstance(event, Exception):
+            p.join()
+            raise event
+        subpage, error = event[:2]
+        results[subpage] = error
+    p.join()
+    return results
+
+
+if __name__ == "__main__":
+    # Crawl categories into their raw tables, e.g. to debug the spider on one: python scraper.py "machine learning"
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python scraper.py <category> [category ...]")
+    for category, error in run_spiders(WikiCFPSpider, sys.argv[1:]).items():
+        print(f"{category}: {error or 'ok'}")
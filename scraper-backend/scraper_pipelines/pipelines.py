@@ -1,10 +1,40 @@
+import io
+import time
+
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 import config
 
 
+def copy_escape(value):
+    """
+    Escape a value for COPY's text format.
+    """
+    if value is None:
+        return "\\N"
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
 class PostgreSQLPipeline:
+    """
+    Buffers scraped conferences and writes them to postgres in bulk with COPY, one transaction per flush.
+    The buffer is flushed once it holds PIPELINE_FLUSH_SIZE items or PIPELINE_FLUSH_INTERVAL seconds
+    have passed since the last flush, and when the spider closes.
+
+    Page records (items with a 'content_hash') are upserted into the scraped pages table in the same
+    transaction as the rows that preceded them, so a page is never recorded without its rows. A page
+    is recorded as not yet cleaned; the cleaning stage marks it once its rows are stored.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
     def open_spider(self, spider):
         """
         Establish a connection to the database.
@@ -17,29 +47,99 @@ class PostgreSQLPipeline:
             port=config.DB_PORT
         )
         self.cur = self.conn.cursor()
+        self.table = sql.Identifier(f"{config.RAW_OUTPUT_TABLE}_{spider.subpage}")
+        self.columns = config.RAW_OUTPUT_COLUMNS + ["page_url"]
 
-        # Ensure table exists
-        self.cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {config.RAW_OUTPUT_TABLE}_{spider.subpage} (
+        # Ensure table exists, with a TEXT column per listed field and the listing page it came from
+        self.cur.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} (
                 id SERIAL PRIMARY KEY,
-                data TEXT
+                {},
+                page_url TEXT
             );
-        """)
+        """).format(self.table, sql.SQL(", ").join(
+            sql.SQL("{} TEXT").format(sql.Identifier(column)) for column in config.RAW_OUTPUT_COLUMNS
+        )))
+        self.cur.execute(sql.SQL("ALTER TABLE {} ADD COLUMN IF NOT EXISTS page_url TEXT;").format(self.table))
         self.conn.commit()
 
+        # Buffer and flush statistics
+        self.buffer = []
+        self.pages = []
+        self.items_written = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.opened_at = self.last_flush = time.monotonic()
+
     def process_item(self, item, spider):
         """
-        Insert each item into table.
+        Buffer each item, flushing when a size or time threshold is reached.
         """
-        data_value = item.get('data', None)
-        sql_query = sql.SQL("""
-            INSERT INTO {} (data) VALUES (%s);
-        """).format(sql.Identifier(f"{config.RAW_OUTPUT_TABLE}_{spider.subpage}"))
-        self.cur.execute(sql_query, (data_value,))
-        self.conn.commit()
+        if 'content_hash' in item:
+            self.pages.append((
+                spider.category, item['page_url'], item['content_hash'],
+                item['etag'], item['last_modified'], item['next_url']
+            ))
+        else:
+            self.buffer.append("\t".join(copy_escape(item.get(column)) for column in self.columns))
+        if (len(self.buffer) >= config.PIPELINE_FLUSH_SIZE
+                or time.monotonic() - self.last_flush >= config.PIPELINE_FLUSH_INTERVAL):
+            self.flush()
         return item
 
+    def flush(self):
+        """
+        Write all buffered conferences with a single COPY, record buffered pages, and commit.
+        """
+        if not self.buffer and not self.pages:
+            self.last_flush = time.monotonic()
+            return
+
+        start = time.monotonic()
+        rows = io.StringIO("\n".join(self.buffer) + "\n")
+        try:
+            if self.buffer:
+                self.cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN;").format(
+                    self.table, sql.SQL(", ").join(map(sql.Identifier, self.columns))
+                ).as_string(self.cur), rows)
+            if self.pages:
+                execute_values(self.cur, f"""
+                    INSERT INTO {config.SCRAPED_PAGES_TABLE}
+                    (category, url, content_hash, etag, last_modified, next_url) VALUES %s
+                    ON CONFLICT (category, url) DO UPDATE
+                    SET content_hash = EXCLUDED.content_hash, etag = EXCLUDED.etag,
+                        last_modified = EXCLUDED.last_modified, next_url = EXCLUDED.next_url,
+                        fetched_at = NOW(), cleaned = FALSE, retry = FALSE;
+                """, self.pages)
+            self.conn.commit()
+        except psycopg2.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            count = len(self.buffer)
+            self.buffer = []
+            self.pages = []
+            self.last_flush = time.monotonic()
+
+        latency = self.last_flush - start
+        self.items_written += count
+        self.flushes += 1
+        self.flush_seconds += latency
+        if self.stats:
+            self.stats.inc_value('pipeline/items_written', count)
+            self.stats.inc_value('pipeline/flushes')
+            self.stats.max_value('pipeline/flush_latency_max', round(latency, 6))
+
     def close_spider(self, spider):
-        """Runs when the spider finishes. Closes DB connection."""
-        self.cur.close()
-        self.conn.close()
+        """Runs when the spider finishes. Flushes remaining rows and closes DB connection."""
+        try:
+            self.flush()
+        finally:
+            elapsed = time.monotonic() - self.opened_at
+            if self.stats:
+                self.stats.set_value('pipeline/items_per_sec', round(self.items_written / elapsed, 3) if elapsed else 0.0)
+                self.stats.set_value(
+                    'pipeline/flush_latency_avg', round(self.flush_seconds / self.flushes, 6) if self.flushes else 0.0
+                )
+            self.cur.close()
+            self.conn.close()